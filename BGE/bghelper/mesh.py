@@ -388,7 +388,7 @@ def uv_scroll(uspd=0.0025, vspd=0.0, layer=0, mesh=None, mat=0, frequency=0):
 # Flattening meshes together
 
 
-def flatten(destination, sources):
+def flatten(destination, sources, use_orientation=False):
     """
     Author: SolarLune
     Date Updated: 3/11/13
@@ -398,6 +398,8 @@ def flatten(destination, sources):
 
     destination = object that you want to alter
     sources = list of objects that you want to flatten into the local mesh
+    use_orientation = if the source objects' world orientations should be applied to their vertices (and normals), so
+    that turned objects are flattened turned, too
 
     Returns a list of the vertices that have been flattened into the destination mesh
 
@@ -484,11 +486,17 @@ def flatten(destination, sources):
                 vert.y *= targetobj.worldScale.y
                 vert.z *= targetobj.worldScale.z
 
+                if use_orientation:
+                    vert.XYZ = targetobj.worldOrientation * vert.XYZ
+
                 vert.XYZ += (op - lp)  # Set each vertex of the source mesh to match one of the target objects'
                 vert.UV = tv.UV  # Mesh vertex position, UV, and normal properties, offset by the target
                 vert.normal = tv.normal  # objects' world positions and the local mesh's world position (because all
                 vert.color = tv.color  # of the vertices belong to the local mesh
 
+                if use_orientation:
+                    vert.normal = targetobj.worldOrientation * tv.normal
+
                 vertindex += 1
 
                 try:
@@ -2,7 +2,7 @@ __author__ = 'SolarLune'
 
 from bge import logic, render
 
-import math,time
+import math,time,heapq
 
 # Nodemaps for game space navigation.
 
@@ -23,7 +23,7 @@ class Node():
 
         self.costs = []
 
-        self.parent = None  # Parent node for path-finding
+        self.parent = None  # Parent node for path-finding; set on the nodes of the last path found through them
 
         #self.g_score = 0
         #self.f_score = 0
@@ -108,15 +108,247 @@ class Path():
         self.temp_points = self.points[:]
 
 
+class SpatialHash():
+
+    """
+    A uniform grid of cells that nodes are sorted into by position, so the nodes near a point can be found without
+    checking every node. Nodes are placed by their position when they're added; call move() when a node moves.
+    """
+
+    def __init__(self, cell_size=4.0):
+
+        self.cell_size = cell_size
+
+        self.cells = {}  # Cell coordinates to the list of nodes in that cell
+        self.node_cells = {}  # Node to the coordinates of the cell it's in
+
+        self.low = None  # The lowest and highest cell coordinates that have held nodes, to know when to stop searching
+        self.high = None
+
+    def __len__(self):
+
+        return len(self.node_cells)
+
+    def __contains__(self, node):
+
+        return node in self.node_cells
+
+    def get_cell(self, position):
+
+        s = self.cell_size
+
+        return int(math.floor(position[0] / s)), int(math.floor(position[1] / s)), int(math.floor(position[2] / s))
+
+    def add(self, node):
+
+        cell = self.get_cell(node.position)
+
+        self.cells.setdefault(cell, []).append(node)
+        self.node_cells[node] = cell
+
+        if self.low is None:
+
+            self.low = list(cell)
+            self.high = list(cell)
+
+        for axis in range(3):
+
+            self.low[axis] = min(self.low[axis], cell[axis])
+            self.high[axis] = max(self.high[axis], cell[axis])
+
+    def remove(self, node):
+
+        # Nodes are found by the cell they were put in rather than their current position, so moved nodes can be
+        # removed too; nodes that aren't in the grid are ignored
+
+        cell = self.node_cells.pop(node, None)
+
+        if cell is None:
+
+            return
+
+        nodes = self.cells[cell]
+
+        nodes.remove(node)
+
+        if not nodes:
+
+            del self.cells[cell]
+
+    def move(self, node):
+
+        if self.get_cell(node.position) != self.node_cells[node]:
+
+            self.remove(node)
+            self.add(node)
+
+    def get_shell(self, center, radius):
+
+        # Yields the nodes in the cells that are exactly radius cells away from the center cell (a hollow cube).
+
+        cx, cy, cz = center
+
+        low_y = max(cy - radius, self.low[1])
+        high_y = min(cy + radius, self.high[1])
+
+        low_z = max(cz - radius, self.low[2])
+        high_z = min(cz + radius, self.high[2])
+
+        # Only the shell's sides are looked through; the cells inside it are skipped unless its top or bottom is in range
+
+        y_sides = [y for y in sorted({cy - radius, cy + radius}) if low_y <= y <= high_y]
+        z_sides = [z for z in sorted({cz - radius, cz + radius}) if low_z <= z <= high_z]
+
+        for x in range(max(cx - radius, self.low[0]), min(cx + radius, self.high[0]) + 1):
+
+            if abs(x - cx) == radius or z_sides:
+
+                y_range = range(low_y, high_y + 1)
+
+            else:
+
+                y_range = y_sides
+
+            for y in y_range:
+
+                if abs(x - cx) == radius or abs(y - cy) == radius:
+
+                    z_range = range(low_z, high_z + 1)
+
+                else:
+
+                    z_range = z_sides
+
+                for z in z_range:
+
+                    nodes = self.cells.get((x, y, z))
+
+                    if nodes:
+
+                        yield from nodes
+
+    def get_shell_size(self, center, radius):
+
+        # Returns how many cells get_shell() would look in (only counting cells within the range that's held nodes).
+
+        def get_volume(r):
+
+            if r < 0:
+
+                return 0
+
+            volume = 1
+
+            for axis in range(3):
+
+                volume *= max(0, min(center[axis] + r, self.high[axis]) - max(center[axis] - r, self.low[axis]) + 1)
+
+            return volume
+
+        return get_volume(radius) - get_volume(radius - 1)
+
+    def get_nearest(self, position, max_radius=None):
+
+        """
+        Yields (distance, node) tuples for the nodes around the position, nearest first. Cells are only searched as the
+        nodes are asked for, so stopping early skips the rest of the grid.
+        :param position: The position to search around.
+        :param max_radius: How far from the position to look for nodes; None looks through all of them.
+        """
+
+        if not self.node_cells:
+
+            return
+
+        center = self.get_cell(position)
+
+        heap = []
+        counter = 0
+
+        # Start at the first shell that reaches the cells that have held nodes, as any shells before it are empty
+
+        radius = max([max(self.low[axis] - center[axis], center[axis] - self.high[axis], 0) for axis in range(3)])
+
+        while True:
+
+            if self.get_shell_size(center, radius) > len(self.cells):
+
+                # Searching shell by shell would check more cells than hold nodes (i.e. the nodes are far apart or far
+                # away), so just check the rest of the nodes at once
+
+                nodes = [n for cell, nodes in self.cells.items() for n in nodes if
+                         max([abs(cell[axis] - center[axis]) for axis in range(3)]) >= radius]
+
+                finished = True
+
+            else:
+
+                nodes = self.get_shell(center, radius)
+
+                finished = False
+
+            for node in nodes:
+
+                d = (node.position - position).magnitude
+
+                if max_radius is None or d <= max_radius:
+
+                    heapq.heappush(heap, (d, counter, node))
+
+                    counter += 1
+
+            # Anything in a cell further out is at least this far away, so any closer nodes are the nearest ones
+
+            reach = radius * self.cell_size
+
+            finished = finished or (max_radius is not None and reach > max_radius) or all(
+                center[axis] - radius <= self.low[axis] and center[axis] + radius >= self.high[axis] for axis in range(3))
+
+            while heap and (finished or heap[0][0] <= reach):
+
+                d, _, node = heapq.heappop(heap)
+
+                yield d, node
+
+            if finished:
+
+                return
+
+            radius += 1
+
+    def get_within(self, position, radius):
+
+        """
+        Returns a list of the nodes that are no further than radius from the position.
+        """
+
+        low = self.get_cell([p - radius for p in position[:3]])
+        high = self.get_cell([p + radius for p in position[:3]])
+
+        if len(self.cells) < (high[0] - low[0] + 1) * (high[1] - low[1] + 1) * (high[2] - low[2] + 1):
+
+            cells = [nodes for cell, nodes in self.cells.items() if
+                     all(low[axis] <= cell[axis] <= high[axis] for axis in range(3))]
+
+        else:
+
+            cells = [self.cells.get((x, y, z)) for x in range(low[0], high[0] + 1) for y in range(low[1], high[1] + 1)
+                     for z in range(low[2], high[2] + 1)]
+
+        return [n for nodes in cells if nodes for n in nodes if (n.position - position).magnitude <= radius]
+
+
 class NodeMap():
 
-    def __init__(self, cost_num=1):
+    def __init__(self, cost_num=1, cell_size=4.0):
 
         self.nodes = []
 
         self.cost_num = cost_num  # Number of costs per node; useful if you need multiple
         #  costs for different values (terrain, risk, wants, dislikes, etc)
 
+        self.index = SpatialHash(cell_size)  # Sorts the nodes by position, to find the ones near a point quickly
+
     def add_node(self, node):
 
         """
@@ -129,64 +361,162 @@ class NodeMap():
 
         self.nodes.append(node)
 
+        self.index.add(node)
+
     def remove_node(self, node):
 
+        """
+        Removes the node from the nodemap, and disconnects it from its neighbors.
+        :param node:
+        :return:
+        """
+
         self.nodes.remove(node)
 
-    def update_neighbors(self, min_dist=0, max_dist=9999, max_connections=9999):
+        self.index.remove(node)
+
+        for neighbor in node.neighbors:
+
+            while node in neighbor.neighbors:
+
+                neighbor.neighbors.remove(node)
+
+        node.neighbors = []
+
+    def update_index(self):
+
+        """
+        Re-sorts the nodes into the nodemap's spatial index; call this after moving nodes' objects, or after adding or
+        removing nodes from the nodes list directly.
+        :return:
+        """
+
+        self.index = SpatialHash(self.index.cell_size)
+
+        for node in self.nodes:
+
+            self.index.add(node)
+
+    def update_neighbors(self, min_dist=0, max_dist=9999, max_connections=9999, nodes=None):
+
+        """
+        Connects nodes to the other nodes between min_dist and max_dist away from them that they can see (that have no
+        nm_solid objects in the way), up to max_connections neighbors per node. Nodes that are already connected are
+        left alone, so this can be called again after changing the nodemap.
+        :param min_dist: The minimum distance between connected nodes.
+        :param max_dist: The maximum distance between connected nodes.
+        :param max_connections: The maximum number of neighbors a node can have.
+        :param nodes: A list of nodes to connect to the nodes around them (i.e. nodes that were just added), instead
+        of connecting every node in the nodemap.
+        :return:
+        """
 
         cont = logic.getCurrentController()
         obj = cont.owner
 
-        evaluated = []
+        def connect(n, m):
+
+            if m in n.neighbors or len(n.neighbors) >= max_connections or len(m.neighbors) >= max_connections:
+
+                return
+
+            if max_dist >= (n.position - m.position).magnitude >= min_dist:
+
+                ray = obj.rayCast(n.position, m.position, 0, 'nm_solid', 1, 1)
+
+                if not ray[0]:
+
+                    n.neighbors.append(m)
+                    m.neighbors.append(n)
+
+        if nodes is not None:
+
+            if len(self.index) != len(self.nodes):
+
+                self.update_index()
+
+            for n in nodes:
+
+                others = self.index.get_within(n.position, max_dist)
+
+                others.sort(key=lambda m: (n.position - m.position).magnitude)  # The closest nodes connect first
+
+                for m in others:
+
+                    if m is not n:
+
+                        connect(n, m)
+
+            return
+
+        # Sort the nodes into cells as large as max_dist, so a node's possible neighbors are only in its cell or the
+        # ones around it
+
+        grid = SpatialHash(max_dist if max_dist > 0 else self.index.cell_size)
 
         for n in self.nodes:
 
-            for m in self.nodes:
+            grid.add(n)
 
-                if n != m and not m in evaluated:
+        order = {n: i for i, n in enumerate(self.nodes)}
 
-                    d = (n.position - m.position).magnitude
+        for n in self.nodes:
+
+            x, y, z = grid.node_cells[n]
 
-                    if max_dist >= d >= min_dist:
+            # Each pair is only checked from the node that comes first, in the order of the nodes list
 
-                        ray = obj.rayCast(n.position, m.position, 0, 'nm_solid', 1, 1)
+            others = [m for cx in (x - 1, x, x + 1) for cy in (y - 1, y, y + 1) for cz in (z - 1, z, z + 1)
+                      for m in grid.cells.get((cx, cy, cz), ()) if order[m] > order[n]]
 
-                        if not ray[0]:
+            others.sort(key=order.get)
 
-                            if len(n.neighbors) < max_connections and len(m.neighbors) < max_connections:
+            for m in others:
 
-                                n.neighbors.append(m)
-                                m.neighbors.append(n)
+                connect(n, m)
 
-            evaluated.append(n)
+    def get_closest_node(self, position, max_radius=None):
 
-    def get_closest_node(self, position):
+        """
+        Returns the closest node to the position that can be seen from it (that has no nm_solid objects in the way).
+        Nodes are checked nearest first, so only the nodes closer than the one returned are raycast to.
+        :param position: The position to find the closest node to.
+        :param max_radius: How far from the position to look for nodes; None looks through all of them.
+        :return: The closest visible node, or None if there isn't one.
+        """
 
         cont = logic.getCurrentController()
 
         obj = cont.owner
 
-        sorted_nodes = self.nodes[:]
-
-        sorted_nodes.sort(key=lambda n: (n.position - position).magnitude)
+        if len(self.index) != len(self.nodes):
 
-        closest = None
+            self.update_index()
 
-        for n in sorted_nodes:
+        for d, n in self.index.get_nearest(position, max_radius):
 
             ray = obj.rayCast(n.position, position, 0, 'nm_solid', 1, 1, 1)
 
             if not ray[0]:
 
-                closest = n
-
-                break
+                return n
 
-        return closest
+        return None
 
     def get_path_to(self, ending_point, starting_point=None, max_check_num=1000, cost_coefficient=None):
 
+        """
+        Finds the shortest path over the nodemap's connections (see update_neighbors()) from the node closest to the
+        starting point to the node closest to the ending point, using A*.
+        :param ending_point: The position to path-find to.
+        :param starting_point: The position to path-find from; defaults to the current object's position.
+        :param max_check_num: The maximum number of nodes to check before giving up.
+        :param cost_coefficient: A list of how much each of the nodes' costs add to the cost of moving onto a node, on
+        top of the distance travelled; defaults to 1 for each cost. The costs and coefficients shouldn't be negative, or
+        the path might not be the shortest one.
+        :return: A Path from the starting node to the goal node, or None if there's no path.
+        """
+
         if cost_coefficient is None:
 
             cost_coefficient = [1 for x in range(self.cost_num)]
@@ -198,12 +528,6 @@ class NodeMap():
         goal = self.get_closest_node(ending_point)
         starting_node = self.get_closest_node(starting_point)
 
-        def get_f_score(node):
-
-            costs = [x*y for x,y in zip(node.costs, cost_coefficient)]
-
-            return (starting_node.obj.position - node.obj.position).magnitude + (node.obj.position - goal.obj.position).magnitude + sum(costs)
-
         if not goal:
 
             print("ERROR: GOAL POSITION CANNOT BE REACHED FROM ANY NODE ON MAP.")
@@ -214,63 +538,85 @@ class NodeMap():
             print("ERROR: STARTING NODE CANNOT BE REACHED FROM ANY NODE ON MAP.")
             return
 
-        open_list = [starting_node]
-        closed_list = []
+        def get_cost(node):
+
+            return sum([x * y for x, y in zip(node.costs, cost_coefficient)])
+
+        def get_h_score(node):
+
+            # The straight-line distance never overestimates the distance left to travel, so the path found is the
+            # shortest one
+
+            return (node.position - goal.position).magnitude
+
+        # The search's state is kept here rather than on the nodes, so searches can't interfere with each other
 
-        exit_loop = False
+        g_scores = {starting_node: 0.0}
+        parents = {starting_node: None}
 
-        for x in range(max_check_num):
+        open_heap = [(get_h_score(starting_node), 0, starting_node)]
+        closed_set = set()
 
-            open_list.sort(key=get_f_score)
+        counter = 1  # Breaks ties between equal f-scores, so nodes themselves are never compared
 
-            current_node = open_list.pop(0)
-            closed_list.append(current_node)
+        while open_heap and len(closed_set) < max_check_num:
+
+            f_score, _, current_node = heapq.heappop(open_heap)
+
+            if current_node in closed_set:
+
+                continue  # An outdated entry for a node that's already been reached more cheaply
+
+            if current_node == goal:
+
+                break
+
+            closed_set.add(current_node)
+
+            current_g = g_scores[current_node]
 
             for neighbor in current_node.neighbors:
 
-                if neighbor in closed_list:
+                if neighbor in closed_set:
 
                     continue
 
-                if neighbor not in open_list:
-
-                    neighbor.parent = current_node
+                g_score = current_g + (neighbor.position - current_node.position).magnitude + get_cost(neighbor)
 
-                    open_list.append(neighbor)
+                if g_score < g_scores.get(neighbor, math.inf):
 
-                    if neighbor == goal:
+                    g_scores[neighbor] = g_score
+                    parents[neighbor] = current_node
 
-                        exit_loop = True  # A path has been found
+                    heapq.heappush(open_heap, (g_score + get_h_score(neighbor), counter, neighbor))
 
-                        break
+                    counter += 1
 
-            if exit_loop:
+        if goal not in parents:
 
-                break
+            print("No path found")
+            return
 
         path = []
 
         target_square = goal
 
-        for x in range(1000):
+        while target_square is not None:
 
             path.append(target_square)
 
-            if target_square == starting_node:
-
-                break
-
-            target_square = target_square.parent
+            target_square = parents[target_square]
 
         path.reverse()  # Go from the start to the goal
 
-        if len(path):
+        # The search itself doesn't touch the nodes, but the path's nodes point back along it, for code that follows
+        # parents from the goal
 
-            return Path(path)  # Create a path object
+        for node in path:
 
-        else:
+            node.parent = parents[node]
 
-            print("No path found")
+        return Path(path)  # Create a path object
 
     def get_path_costs(self, path):
 
@@ -1,894 +1,4425 @@
-__author__ = 'SolarLune'
-
-# Random level generation module.
-# TODO: Add rectangular rooms to the GenNodes room styles.
-
-import random
-import math
-import copy
-
-from bge import logic
-import mathutils
-
-from .mesh import get_dimensions
-from .math import clamp
-
-# CONSTANTS
-
-# Connection styles for the GenNodes function;
-
-GN_CONNECTION_STYLE_ONE = 0  # ONE = all nodes connect to another one (other than themselves) randomly
-GN_CONNECTION_STYLE_ALL = 1  # ALL = Each node makes a connection to every other node
-GN_CONNECTION_STYLE_HUB = 2  # HUB = Each node connects to a pre-determined node (like a spiderweb or a "splash")
-
-GN_ROOM_STYLE_ROUND = 0  # Explodes a round room for the node
-GN_ROOM_STYLE_SQUARE = 1  # Explodes a rectangular room for the node
-
-RLG_POP_CEIL = 0  # When
-RLG_POP_END = 1
-RLG_POP_STRAIGHT = 2
-RLG_POP_CORNER = 3
-RLG_POP_T_END = 4
-RLG_POP_4WAY = 5
-
-GSC_EDGE_BLANK = 0
-GSC_EDGE_VOID = 1
-GSC_EDGE_EXTEND = 2
-GSC_EDGE_WRAP = 3
-
-# Helper Functions
-
-
-def get_surrounding_cells(room, cell_y, cell_x, ignore=0, edge=0):
-    """
-
-    Author : SolarLune
-    Date Updated : 11/24/13
-
-    Gets and returns the values in the indices in the surrounding cells and count from the room array supplied.
-
-    room = Room array
-    celly, cellx = cell co-ordinates to check around
-    ignore = Value to ignore (not count); If set to None, then no number will be ignored
-
-    TODO: edge = What to do when checking cells on the edges of the list.
-
-    0 = Blank; It's assumed the non-existent cell is 0.
-    1 = Void; The non-existent cell's value returns None. This will affect the returned
-        number of surrounding cells accordingly.
-    2 = Extend; It's assumed the non-existent cell is the same as the current number.
-    3 = Wrap; It's assumed the non-existent cell is the same as the cell on the opposite border.
-
-    Y'know, wrapping around the map would be possible, too - you'd just have
-    to check for that case.
-
-    Returns a dictionary consisting of two keys.
-    "cells" = value returned in the cell directly one value away
-    (i.e. left is one to the left, right is one to the right, etc)
-    "sum" = how many non-zero values were found
-
-    """
-
-    if cell_x > 0:
-        left = room[cell_y][cell_x - 1]
-    else:
-        if edge == 0:  # Blank
-            left = 0
-        elif edge == 1:  # Void
-            left = None
-        elif edge == 2:  # Extend
-            left = room[cell_y][cell_x]
-        elif edge == 3:  # Wrap
-            left = room[cell_y][len(room[cell_y]) - 1]
-
-    if cell_x < len(room[cell_y]) - 1:
-        right = room[cell_y][cell_x + 1]
-    else:
-        if edge == 0:
-            right = 0
-        elif edge == 1:
-            right = None
-        elif edge == 2:
-            left = room[cell_y][cell_x]
-        elif edge == 3:
-            right = room[cell_y][0]
-
-    if cell_y > 0:
-        up = room[cell_y - 1][cell_x]
-    else:
-        if edge == 0:
-            up = 0
-        elif edge == 1:
-            up = None
-        elif edge == 2:
-            left = room[cell_y][cell_x]
-        elif edge == 3:
-            up = room[len(room) - 1][cell_x]
-
-    if cell_y < len(room) - 1:
-        down = room[cell_y + 1][cell_x]
-    else:
-        if edge == 0:
-            down = 0
-        elif edge == 1:
-            down = None
-        elif edge == 2:
-            left = room[cell_y][cell_x]
-        elif edge == 3:
-            down = room[0][cell_x]
-
-
-    #print (down)
-
-    cells = [left, right, up, down]
-
-    num = len(cells) - cells.count(ignore) - cells.count(None)
-
-    return ({'cells': {'left': left, 'right': right, 'up': up, 'down': down}, 'num': num})
-
-
-# ~~~~ Generation Functions ~~~~~
-
-def gen_line(size_x=9, size_y=9, line_y=None, random_seed=None, line_types=[1], fill_types=[2], empty_types=[0], room_list=None):
-
-    randomstate = random.getstate()  # Used to preserve random settings before using the function
-
-    random.seed(random_seed)  # Set the seed, if there is one
-
-    if room_list is None:
-
-        room = []
-
-        for y in range(size_y):  # Create empty rooms
-            room.append([])
-            for x in range(size_x):
-                room[y].append(random.choice(empty_types))
-
-    else:
-
-        room = copy.deepcopy(room_list)
-
-    if line_y is None:
-
-        ly = size_y // 2 + random.randint(-size_y // 4, size_y // 4)
-
-    else:
-
-        ly = line_y
-
-    for x in range(len(room)):
-
-        for y in range(len(room[x])):
-
-            if y == ly:
-
-                room[y][x] = random.choice(line_types)
-
-            elif y < ly:
-
-                room[y][x] = random.choice(fill_types)
-
-        r = random.random
-        ly -= int(round(r()))
-        ly += int(round(r()))
-
-        if ly < 0:
-            ly = 0
-
-        elif ly > len(room) - 1:
-            ly = len(room) - 1
-
-    random.setstate(randomstate)
-
-    return room
-
-
-def gen_growth(size_x=9, size_y=9, maxnum=0, random_seed=None, must_connect=1, maxcon=0, roomtypes=[1], room_list=None):
-    """
-
-        2D RANDOM ROOM GENERATOR
-
-        Author: SolarLune
-        Date Updated: 6/24/11
-
-        xsize = X-size of the randomly generated room
-
-        size_y = Y-size of the randomly generated room
-
-        Note that if you use an even number, then there's no middle cell, so you can't be exactly sure which cell WILL be filled.
-
-        maxnum = Maximum number of rooms; by default will make half of the total rooms populated (i.e. 5x5 = 25 / 2 = ~13)
-
-        random_seed = Random seed value; this will (hopefully) make it so that each randomly generated map can be the same with a specific seed
-
-        maxcon = Maximum connections each room can have. Hallways can only have one other connection,
-        for example, and the default is 0, which is as many as possible (yes, hallways actually have two,
-        but each hallway thinks it's the last one, basically)
-
-        roomtypes = Room types (for example, you might want some rooms to be sand, others rock, etc.); basically, the
-        generation will contain random selections of these numbers. So, if you wanted a map of sand, grass, and concrete,
-        you could make a list of three numbers, and replace those numbers with the correct values later on
-
-        room_list = A previous room list (maybe you have a list that you got and want to add on values, or change the theme by using the same seed
-        as before and using different 'roomtypes'. Beware - ensuring that the room_list is the correct size is up to you.
-    """
-
-    currentnum = 0
-
-    if room_list is None:
-
-        room = []
-
-        for y in range(size_y):  # Create empty rooms
-            room.append([])
-            for x in range(size_x):
-                room[y].append(0)
-    else:
-
-        room = room_list[:]
-
-        roomnumbers = 0
-
-        for x in room:  # Add number of occupied rooms (not 0)
-
-            currentnum += x.count(not 0)
-
-        #print ([x.count(0) for x in room[:]])
-        #print ('----')
-
-    #### CELL GENERATION ####
-
-    randomstate = random.getstate()  # Used to preserve random settings before using the function
-
-    random.seed(random_seed)  # Set the seed, if there is one
-
-    if must_connect and currentnum == 0:
-        middley = math.floor(size_y / 2.0)  # Set the middle cell to be filled
-        middlex = math.floor(size_x / 2.0)
-        room[middley][middlex] = random.choice(roomtypes)
-
-        currentnum += 1
-
-    if maxnum > 0:
-        maxsize = maxnum
-    else:
-        maxsize = (size_x * size_y) / 2
-
-    rlgpass = 0  # Failsafe
-
-    while (currentnum < maxsize):
-
-        rlgpass += 1
-        if rlgpass > 100000:  # If the number of passes exceeds a certain amount, it breaks out; unnecessary now
-            currentnum = maxsize
-            break
-
-        randomy = math.floor(random.random() * size_y)  # Choose a random cell
-        randomx = math.floor(random.random() * size_x)
-
-        if room[randomy][randomx] == 0:  # Don't set a cell more than once
-
-            if must_connect:
-
-                sur = get_surrounding_cells(room, randomy, randomx)
-
-                cellaround = 0  # If there's a connection around the current cell
-
-                for c in sur['cells']:
-                    cell = sur['cells'][c]
-                    if cell != 0 and cell != None:
-                        cellaround = 1  # If there's another cell surrounding this one that isn't 0 or None
-
-                if sur['num'] > maxcon and maxcon > 0:
-                    pass
-
-                elif cellaround:
-                    room[randomy][randomx] = random.choice(roomtypes)
-                    currentnum += 1
-
-            else:
-                room[randomy][randomx] = random.choice(roomtypes)
-                currentnum += 1
-
-    random.setstate(randomstate)  # Reset random settings
-
-    #print ('Room:')
-
-    #for y in room:		# Quickie room debug
-    #	print (y)
-
-    return room
-
-
-def gen_nodes(size_x=9, size_y=9, nodecount=None, spacing=1, random_seed=None, nodetypes=[1], halltypes=[1], empty_types=[0],
-             straight_halls=False, connection_style=GN_CONNECTION_STYLE_ONE,
-             room_style=GN_ROOM_STYLE_SQUARE, min_room_size=2, max_room_size=5, room_list=None):
-    """
-
-    This method of random generation spawns several nodes, and then connects those nodes with halls.
-
-    x, size_y = size of the generated list
-
-    nodecount = number of nodes to spawn; defaults to half of the width of the room.
-
-    spacing = spawn nodes with a minimum number of >spacing< blank nodes between them (both x and y axes individually).
-    An example would be a node at [4, 4] and another one at [18, 5]. If spacing == 1, then that won't work, since
-    5 - 4 = 1 node difference.
-    if spacing == 0 (default), distance has no bearing on where nodes are spawned
-
-    Note! If spacing is too large and the room has too small a size, it will basically be tried for, but otherwise
-    the room will generate however it can. Use small spacing amounts and large rooms.
-
-    random_seed = random seed for spawning the same list each time
-
-    nodetypes = a list of different (randomly chosen) numbers that can spawn for the nodes separating halls
-
-    halltypes = a list of different (randomly chosen) numbers that can spawn for the halls in-between nodes
-
-    empty_types = a list of different (randomly chosen) numbers that can spawn for the non-hall or node spots
-
-    straight_halls = determines if the hallways basically only bend once max, or if they "stair-step" between nodes
-
-    connection_style = determines how the nodes connect to each other.
-
-    GN_CONNECTION_STYLE_ONE = All nodes each connect to one other randomly chosen node
-    (this will result in the map being connected correctly, of course)
-
-    GN_CONNECTION_STYLE_ALL = All nodes connect to each other. For an example, think of a square with four points -
-    each point connects	to the three other points.
-
-    GN_CONNECTION_STYLE_HUB = All nodes connect to one other node specifically; i.e., if you have 10 nodes, one
-    node will connect to all other nodes, and every other node will only connect to the previous one
-
-    room_style = determines how the nodes form rooms.
-
-    GN_ROOM_STYLE_ROUND = Round rooms
-    GN_ROOM_STYLE_SQUARE = Octopus-shaped rooms
-
-    min_room_size, max_room_size = determines how large each node room can be minimum and maximum
-
-    room_list = preexisting list to use; numbers that are specified in nodetypes are interpreted as nodes, numbers
-    that are in halltypes are interpreted as halls, and numbers that are in empty_types are interpreted as "empties".
-    The nodecount you specify is added to the existing nodes you have pre-existing in the room list.
-    """
-
-    if room_list != None:
-
-        if not isinstance(room_list, list):
-            print("ERROR: Provided room_list is not a list")
-
-            return []
-
-        maplist = room_list
-        middle = [size_x // 2, size_y // 2]
-
-        size_y = len(maplist)
-        size_x = len(maplist[0])
-
-    else:
-
-        maplist = []
-
-        for j in range(size_y):
-
-            maplist.append([])
-
-            for i in range(size_x):
-                maplist[j].append(random.choice(empty_types))
-
-        #maplist = [[random.choice(empty_types) for j in range(xsize)] for i in range(size_y)]
-
-        middle = [size_x // 2, size_y // 2]
-
-    randomstate = random.getstate()
-
-    random.seed(random_seed)
-
-    #maplist[middle[1]][middle[0]] = random.choice(
-
-    nodelist = []  # List of nodes
-    toconnect = {}  # List of nodes that are still up for connections and their connection counts
-
-    if nodecount is None:
-        ndc = int(size_x / 2)
-    else:
-        ndc = nodecount
-
-    if room_list:
-
-        list_node_count = 0
-
-        for c in range(len(room_list)):
-            for x in range(len(room_list[c])):
-                if room_list[c][x] in nodetypes:
-                    node = (c, x)
-                    nodelist.append(node)
-                    toconnect[node] = []
-
-                    list_node_count += 1
-
-    for n in range(ndc):  # Generate nodes
-
-        node = None
-
-        if spacing <= 0:
-
-            while (node is None):
-
-                cy = random.choice(range(len(maplist)))
-                cx = random.choice(range(len(maplist[cy])))
-
-                #if maplist[cy][cx] in empty_types:
-                if not maplist[cy][cx] in nodetypes:
-                    node = (cy, cx)
-
-                    nodelist.append(node)
-                    toconnect[node] = []  # What nodes the node is connected to
-
-        else:
-
-            for dist in range(spacing + 1, -1,
-                              -1):  # If you can't find a node at the specified minimum distance, then search at a closer distance
-
-                for i in range(1000):  # Set a limit so that it doesn't hang the game :/
-
-                    cy = random.choice(range(len(maplist)))
-                    cx = random.choice(range(len(maplist[cy])))
-
-                    #if maplist[cy][cx] in empty_types or maplist[cy][cx] in halltypes:
-                    if not maplist[cy][cx] in nodetypes:
-                        node = (cy, cx)
-
-                        for other in nodelist:
-                            if other != node:
-
-                                diffx = abs(node[1] - other[1])
-                                diffy = abs(node[0] - other[0])
-
-                                if diffx < dist or diffy < dist:  # Discard the node placement if it's too close to another node
-                                    node = None  # And find another node placement (in the same 100x for loop above)
-                                    break
-
-                    if node != None:
-                        nodelist.append(node)
-                        toconnect[node] = []
-                        break
-
-                if node != None:
-                    break
-
-        maplist[node[0]][node[1]] = random.choice(nodetypes)
-
-    if max_room_size > 0:  # Create rooms
-
-        for n in nodelist:
-
-            room_size = int(random.uniform(min_room_size, max_room_size))
-
-            if room_size > 0:
-
-                #rv = mathutils.Vector([random.random(), random.random()])
-
-                #rv.magnitude = room_size
-
-                for y in range(len(maplist)):
-
-                    for x in range(len(maplist[y])):
-
-                        #cell = room_list[y][x]
-
-                        if room_style == GN_ROOM_STYLE_ROUND:
-
-                            if (mathutils.Vector([y, x]) - mathutils.Vector([n[0], n[1]])).magnitude <= room_size:
-                                maplist[y][x] = maplist[n[0]][n[1]]
-
-                        else:
-
-                            if abs(y - n[0]) < room_size and abs(x - n[1]) < room_size:
-                                maplist[y][x] = maplist[n[0]][n[1]]
-
-    if len(nodelist) <= 1:
-        print("ERROR: nodecount needs to be larger than 1")
-        return
-
-    if connection_style == GN_CONNECTION_STYLE_HUB:
-        connection_list = [random.choice(list(toconnect.keys()))]
-
-    for node in list(toconnect.keys()):  # Connect nodes
-
-        destnode = None
-
-        while destnode is None:  # Find a destination node
-
-            if len(toconnect[node]) >= len(toconnect.keys()) - 1:  # Connected to all available nodes
-
-                break
-
-            else:
-
-                if connection_style == GN_CONNECTION_STYLE_ONE:
-                    connection_list = [random.choice(list(toconnect.keys()))]  # Changes with connection_style
-                elif connection_style == GN_CONNECTION_STYLE_ALL:
-                    connection_list = [c for c in
-                                       toconnect.keys()]  #[random.choice(list(toconnect.keys()))] # Changes with connection_style
-
-                if connection_style == GN_CONNECTION_STYLE_HUB and connection_list[
-                    0] == node:  # If you're set to HUB connection and the node selected is you,
-                    break  # Break out of the while loop
-
-                for dn in connection_list:
-
-                    if dn != node and not dn in toconnect[node]:
-
-                        destnode = dn
-
-                        diff = mathutils.Vector(dn) - mathutils.Vector(node)
-
-                        if straight_halls:
-
-                            target = list(node)
-
-                        else:
-
-                            target = mathutils.Vector(node)
-                            axis_x = 1
-
-                        for x in range(1000):  # Can make a 10000 unit path
-
-                            if straight_halls:
-
-                                if destnode[0] > target[0]:
-                                    target[0] += 1
-                                elif destnode[0] < target[0]:
-                                    target[0] -= 1
-                                elif destnode[1] > target[1]:
-                                    target[1] += 1
-                                elif destnode[1] < target[1]:
-                                    target[1] -= 1
-
-                            else:
-
-                                axis_x = not axis_x
-
-                                if axis_x:
-                                    target.x += diff.normalized().x
-                                else:
-                                    target.y += diff.normalized().y
-
-                            target_rnd = (int(clamp(round(target[0]), 0, size_x - 1)),
-                                          int(clamp(round(target[1]), 0, size_y - 1)))
-
-                            if target_rnd == destnode:  #target_floor == destnode or target_ceil == destnode:									# Destination
-
-                                maplist[destnode[0]][destnode[1]] = random.choice(
-                                    nodetypes)  # Make sure we didn't overwrite it
-                                maplist[node[0]][node[1]] = random.choice(nodetypes)
-
-                                toconnect[tuple(node)].append(destnode)
-                                toconnect[tuple(destnode)].append(node)
-
-                                break
-
-                            else:
-
-                                #if maplist[target_rnd[0]][target_rnd[1]] in empty_types: # Not occupied
-                                if not maplist[target_rnd[0]][target_rnd[1]] in nodetypes:  # Not occupied
-                                    maplist[target_rnd[0]][target_rnd[1]] = random.choice(halltypes)
-
-    random.setstate(randomstate)
-
-    return (maplist)
-
-
-##### Map population functions #####
-
-def invert(room_list, inversion_dict):
-    """
-
-    Inverts the room_list provided. Provide a list of what values to invert, and what the inverted value should be.
-    For example, for inversion_dict:
-
-    {0:1, 3:4, ...}
-
-    So that if you provide a list such as:
-
-    [[0,0,0,0,1,1]
-    [0,0,0,1,1,1,]
-    [0,0,1,3,3,3]]
-
-    You'll get returned
-
-    [[1,1,1,1,0,0]
-    [1,1,1,0,0,0,]
-    [1,1,0,4,4,4,]]
-
-    """
-
-    l = copy.deepcopy(room_list)
-
-    for y in range(len(l)):
-
-        for x in range(len(l[y])):
-
-            for i in inversion_dict:
-
-                if l[y][x] == i:
-                    l[y][x] = inversion_dict[i]
-
-                #elif l[y][x] == inversion_dict[i]: # Vice-versa part; commented out for better capabilities
-
-                #	l[y][x] = i
-
-    return l
-
-
-def clean_up(room_list):
-    """
-
-    Cleans up the room list provided so that if there's numbers that are isolated, they are changed to the surrounding number.
-
-    I.e.
-
-    [[0, 0, 0, 1]
-    [0, 0, 1, 0]
-    [0, 0, 0, 0]
-    [1, 1, 1, 0],
-    [1, 0, 1, 1,]]
-
-    Gets turned to
-
-    [[0, 0, 0, 0]
-    [0, 0, 0, 0]
-    [0, 0, 0, 0]
-    [1, 1, 1, 0],
-    [1, 1, 1, 1,]]
-
-    """
-
-    l = copy.deepcopy(room_list)
-
-    for y in range(len(l)):
-
-        for x in range(len(l[y])):
-
-            this = l[y][x]
-
-            sur = get_surrounding_cells(room_list, y, x, this, GSC_EDGE_VOID)
-
-            cells = sur['cells']
-
-            n = 0
-
-            c = [cells['left'] is None, cells['right'] is None, cells['up'] is None, cells['down'] is None]
-
-            for i in c:
-
-                if i:
-                    n += 1
-
-            if sur['num'] == 4 or sur['num'] + n == 4:
-
-                if cells['left'] != this and cells['left'] != None:
-                    l[y][x] = cells['left']
-                elif cells['right'] != this and cells['right'] != None:
-                    l[y][x] = cells['right']
-                elif cells['up'] != this and cells['up'] != None:
-                    l[y][x] = cells['up']
-                elif cells['down'] != None:
-                    l[y][x] = cells['down']
-
-    return l
-
-
-def populate(room_list, room_4way, room_straight, room_end, room_corner, room_t, room_ceiling={0: None}, spawn_point=None,
-             varying_size=0):
-    """
-    Populates the in-game world with floor pieces according to the room that you feed into the function.
-
-    room_list = a room list to check that's generated with a Gen...() function.
-
-    room_4way - room_middle = dictionaries of room pieces to choose from. The numbered indices correspond to the numbers
-    you fed into the generation function. Will be randomly chosen from to allow for some good-looking random level
-    design. The dictionaries should look like:
-
-    room_4way = {1:['Room4WayRock', 'Room4WayStone', 'Room4WayStone2', etc], 2:[...]}
-
-    The number represents the cell type (i.e. a 1 on the grid will spawn one of the rooms in the 1 list)
-
-    room_4way = a room with four exits (a cross shape)
-    room_straight = a room with two exits across from each other; turned horizontally
-    room_end = a room with one exit (a dead end); opens to the west.
-    room_corner = a room with two exits (an L-shaped room); opens to the west and turns north (left).
-    room_t = a room with three exits (a T-shaped room); facing "upside-down", so that the flat part faces south.
-
-    room_ceiling = the same as above, but optional. This would be the objects to place on every null value (i.e. 0)
-
-    spawn_point = the center of the map, usually; if left to None, it will be the calling object's world position.
-
-    varying_size = if the size of the rooms is individual (i.e. each room can be different sizes), or if they're all the
-    same
-
-    NOTE: Each game object that gets spawned gets a property called rlg_info with information about its place in the
-    level generation recorded in it. The rlg_info property has three keys: "shape", "pos", and "type".
-
-    The "shape" key equals one of the RLG_POP_xxxxx constants, which dictates what shape the object spawned was supposed to be.
-    The "pos" key equals the grid position in the random level map, with the Y-coordinate (or row) first, and the X-coordinate second.
-    The "type" key equals what type of object was spawned based on the random level map's numbers (i.e. it's a 1 if it was spawned
-    where a 1 was on the random level map).
-
-    Returns a dictionary comprised of two keys:
-    "spawned: A list of all room objects spawned
-    "room_map": The room_list that you fed in, but with the values replaced by references to the room objects spawned
-    (useful for storage and looking up a room in the list later)
-
-    """
-
-    sce = logic.getCurrentScene()
-    cont = logic.getCurrentController()
-    obj = cont.owner
-
-    spawned = []
-
-    rl = copy.deepcopy(room_list)
-
-    if not varying_size:
-
-        i = list(room_4way.keys())[0]
-
-        r = room_4way[i]
-
-        roomsize = get_dimensions(r[0])[0]
-
-    for ry in range(len(room_list)):
-
-        cy = abs(ry - (len(
-            room_list) - 1))  # We have to do this because otherwise, the check will go from bottom to top, incorrectly (the data will be turned around)
-
-        for rx in range(len(room_list[ry])):
-
-            if not room_list[ry][rx] in room_ceiling:  # Not blank
-
-                cell = room_list[ry][rx]
-
-                sur = get_surrounding_cells(room_list, ry, rx)
-
-                if sur['num'] == 1:  # End
-
-                    roomchoice = random.choice(room_end[cell])
-
-                    r = sce.addObject(roomchoice, obj)
-                    ori = r.orientation.to_euler()
-
-                    d = sur['cells']
-
-                    if d['right']:
-                        ori.z = math.pi
-                    elif d['left']:
-                        ori.z = 0.0
-                    elif d['up']:
-                        ori.z = -math.pi / 2.0
-                    elif d['down']:
-                        ori.z = math.pi / 2.0
-
-                elif sur['num'] == 2:  # Corner or Straight-through
-
-                    d = sur['cells']
-
-                    if (d['left'] and d['right']) or (d['up'] and d['down']):
-                        straight = 1
-                    else:
-                        straight = 0
-
-                    if straight:
-
-                        roomchoice = random.choice(room_straight[cell])
-
-                        r = sce.addObject(roomchoice, obj)
-                        ori = r.orientation.to_euler()
-
-                        if d['left'] and d['right']:
-                            ori.z = 0.0
-                        elif d['up'] and d['down']:
-                            ori.z = math.pi / 2.0
-                    else:
-
-                        roomchoice = random.choice(room_corner[cell])
-
-                        r = sce.addObject(roomchoice, obj)
-                        ori = r.orientation.to_euler()
-
-                        if d['left'] and d['up']:
-                            ori.z = 0.0
-                        elif d['left'] and d['down']:
-                            ori.z = math.pi / 2.0
-                        elif d['right'] and d['up']:
-                            ori.z = -math.pi / 2.0
-                        else:
-                            ori.z = math.pi
-
-                elif sur['num'] == 3:  # Middle
-
-                    roomchoice = random.choice(room_t[cell])
-                    r = sce.addObject(roomchoice, obj)
-                    ori = r.orientation.to_euler()
-
-                    d = sur['cells']
-
-                    if d['left'] and d['right'] and d['up']:
-                        ori.z = 0.0
-                    elif d['left'] and d['up'] and d['down']:
-                        ori.z = math.pi / 2.0
-                    elif d['right'] and d['up'] and d['down']:
-                        ori.z = -math.pi / 2.0
-                    else:
-                        ori.z = math.pi
-
-                else:  # 4-way
-                    roomchoice = random.choice(room_4way[cell])
-                    r = sce.addObject(roomchoice, obj)
-                    ori = r.orientation.to_euler()
-
-                spawned.append(r)
-
-                r.orientation = ori
-
-                rlg_info = {'shape': None, 'type': cell, 'pos': (ry, rx)}
-
-                if sur['num'] == 1:
-                    rlg_info['shape'] = RLG_POP_END
-                elif sur['num'] == 2:
-                    if straight:
-                        rlg_info['shape'] = RLG_POP_STRAIGHT
-                    else:
-                        rlg_info['shape'] = RLG_POP_CORNER
-                elif sur['num'] == 3:
-                    rlg_info['shape'] = RLG_POP_T_END
-                else:
-                    rlg_info['shape'] = RLG_POP_4WAY
-
-                r['rlg_info'] = rlg_info
-
-                rl[ry][rx] = r
-
-                if varying_size:
-                    roomsize = get_dimensions(r)
-
-                halfmapw = math.floor(len(room_list[0]) / 2.0) * roomsize[0]
-                halfmaph = math.floor(len(room_list) / 2.0) * roomsize[1]
-
-                if spawn_point is None:
-                    spawn_point = list(obj.worldPosition)
-                else:
-                    spawn_point = list(spawn_point)
-
-                pos = [(rx * roomsize[0]) - (halfmapw) + spawn_point[0], (cy * roomsize[1]) - (halfmaph) + spawn_point[1], spawn_point[2]]
-
-                r.worldPosition = pos
-
-            else:  # Blank, so it's a ceiling piece.
-
-                if not room_ceiling[room_list[ry][rx]] is None:
-
-                    roomchoice = random.choice(room_ceiling[room_list[ry][rx]])
-                    r = sce.addObject(roomchoice, obj)
-                    spawned.append(r)
-
-                    rl[ry][rx] = r
-
-                    rlg_info = {'shape': RLG_POP_CEIL, 'type': room_list[ry][rx], 'pos': (ry, rx)}
-
-                    r['rlg_info'] = rlg_info
-
-                    halfmapw = math.floor(len(room_list[0]) / 2.0) * roomsize[0]
-                    halfmaph = math.floor(len(room_list) / 2.0) * roomsize[1]
-
-                    if spawn_point is None:
-                        spawn_point = list(obj.worldPosition)
-                    else:
-                        spawn_point = list(spawn_point)
-
-                    pos = [(rx * roomsize[0]) - (halfmapw) + spawn_point[0], (cy * roomsize[1]) - (halfmaph) + spawn_point[1],
-                           spawn_point[2]]
-                    r.worldPosition = pos
-
-    return ({'spawned': spawned, 'room_map': rl})
+__author__ = 'SolarLune'
+
+# Random level generation module.
+# TODO: Add rectangular rooms to the GenNodes room styles.
+
+import random
+import math
+import collections
+import concurrent.futures
+import hashlib
+import io
+import mmap
+import os
+import struct
+import array
+import sys
+import time
+import zlib
+
+from bge import logic
+import mathutils
+
+try:
+    import numpy
+except ImportError:  # NumPy is optional; RoomGrids fall back to the array module without it
+    numpy = None
+
+from .mesh import get_dimensions, flatten, unflatten, make_unique_mesh
+from .math import clamp
+
+# CONSTANTS
+
+RLG_VERSION = 1  # Bumped whenever generation changes, so that levels cached by an older version aren't used
+
+# Connection styles for the GenNodes function;
+
+GN_CONNECTION_STYLE_ONE = 0  # ONE = all nodes connect to another one (other than themselves) randomly
+GN_CONNECTION_STYLE_ALL = 1  # ALL = Each node makes a connection to every other node
+GN_CONNECTION_STYLE_HUB = 2  # HUB = Each node connects to a pre-determined node (like a spiderweb or a "splash")
+GN_CONNECTION_STYLE_MST = 3  # MST = Nodes connect to their nearby nodes along a minimum spanning tree (plus optional loops)
+
+GN_ROOM_STYLE_ROUND = 0  # Explodes a round room for the node
+GN_ROOM_STYLE_SQUARE = 1  # Explodes a rectangular room for the node
+
+GN_NODE_PLACEMENT_RANDOM = 0  # RANDOM = Tries random spots for each node, getting closer if it can't find one far enough
+GN_NODE_PLACEMENT_POISSON = 1  # POISSON = Poisson-disk samples the map, so nodes always keep their spacing
+
+# Growth styles for the GenGrowth function;
+
+GG_GROWTH_STYLE_RANDOM = 0  # RANDOM = Picks random cells from the whole map until one can be filled
+GG_GROWTH_STYLE_FRONTIER = 1  # FRONTIER = Picks random cells only from the empty cells bordering the filled ones
+
+RLG_POP_CEIL = 0  # When
+RLG_POP_END = 1
+RLG_POP_STRAIGHT = 2
+RLG_POP_CORNER = 3
+RLG_POP_T_END = 4
+RLG_POP_4WAY = 5
+
+# Neighbor bits of the masks get_cell_shapes() returns; the diagonal bits are only used with eight_way
+
+RLG_MASK_LEFT = 1
+RLG_MASK_RIGHT = 2
+RLG_MASK_UP = 4
+RLG_MASK_DOWN = 8
+RLG_MASK_UP_LEFT = 16
+RLG_MASK_UP_RIGHT = 32
+RLG_MASK_DOWN_LEFT = 64
+RLG_MASK_DOWN_RIGHT = 128
+
+# Z-rotations of populated pieces, indexed by the quarter turns get_cell_shapes() returns
+
+RLG_ROTATIONS = (0.0, math.pi / 2.0, math.pi, -math.pi / 2.0)
+
+# Shape and quarter turns of the piece for every 4-bit mask, matching how the pieces are modeled (see populate())
+
+_SHAPE_TABLE = [RLG_POP_4WAY] * 16
+_ROTATION_TABLE = [-1] * 16
+
+for _mask, _shape, _turns in ((RLG_MASK_LEFT, RLG_POP_END, 0),
+                              (RLG_MASK_RIGHT, RLG_POP_END, 2),
+                              (RLG_MASK_UP, RLG_POP_END, 3),
+                              (RLG_MASK_DOWN, RLG_POP_END, 1),
+                              (RLG_MASK_LEFT | RLG_MASK_RIGHT, RLG_POP_STRAIGHT, 0),
+                              (RLG_MASK_UP | RLG_MASK_DOWN, RLG_POP_STRAIGHT, 1),
+                              (RLG_MASK_LEFT | RLG_MASK_UP, RLG_POP_CORNER, 0),
+                              (RLG_MASK_LEFT | RLG_MASK_DOWN, RLG_POP_CORNER, 1),
+                              (RLG_MASK_RIGHT | RLG_MASK_DOWN, RLG_POP_CORNER, 2),
+                              (RLG_MASK_RIGHT | RLG_MASK_UP, RLG_POP_CORNER, 3),
+                              (RLG_MASK_LEFT | RLG_MASK_RIGHT | RLG_MASK_UP, RLG_POP_T_END, 0),
+                              (RLG_MASK_LEFT | RLG_MASK_UP | RLG_MASK_DOWN, RLG_POP_T_END, 1),
+                              (RLG_MASK_LEFT | RLG_MASK_RIGHT | RLG_MASK_DOWN, RLG_POP_T_END, 2),
+                              (RLG_MASK_RIGHT | RLG_MASK_UP | RLG_MASK_DOWN, RLG_POP_T_END, 3)):
+    _SHAPE_TABLE[_mask] = _shape
+    _ROTATION_TABLE[_mask] = _turns
+
+if numpy is not None:
+    _SHAPE_TABLE_NP = numpy.array(_SHAPE_TABLE, dtype=numpy.int8)
+    _ROTATION_TABLE_NP = numpy.array(_ROTATION_TABLE, dtype=numpy.int8)
+
+GSC_EDGE_BLANK = 0
+GSC_EDGE_VOID = 1
+GSC_EDGE_EXTEND = 2
+GSC_EDGE_WRAP = 3
+
+# Storage types for RoomGrids; 'b' is a signed byte per cell, 'h' a signed short, and 'i' a signed 32-bit int (for
+# region labels and distances, mostly).
+
+RG_TYPE_INT8 = 'b'
+RG_TYPE_INT16 = 'h'
+RG_TYPE_INT32 = 'i'
+
+_RG_TYPES = (RG_TYPE_INT8, RG_TYPE_INT16, RG_TYPE_INT32)  # From narrowest to widest
+_RG_RANGES = {RG_TYPE_INT8: (-128, 127), RG_TYPE_INT16: (-32768, 32767), RG_TYPE_INT32: (-2 ** 31, 2 ** 31 - 1)}
+_RG_SIZES = {RG_TYPE_INT8: 1, RG_TYPE_INT16: 2, RG_TYPE_INT32: 4}
+
+if numpy is not None:
+    _RG_DTYPES = {RG_TYPE_INT8: numpy.int8, RG_TYPE_INT16: numpy.int16, RG_TYPE_INT32: numpy.int32}
+
+# Room grids
+
+
+class RoomGrid():
+
+    """
+    A compact 2D grid of cell values, stored contiguously (one byte or one short per cell) instead of as a list of lists
+    of Python ints. Every function in this module accepts and returns RoomGrids; list-of-lists room lists are still
+    accepted everywhere, and can be converted with RoomGrid.from_list() and RoomGrid.to_list().
+
+    The grid is indexed like the old room lists - grid[y][x], len(grid) for the height, len(grid[0]) for the width - and
+    also as grid[y, x]. Rows returned by grid[y] are writable views into the grid, not copies.
+
+    When NumPy is available, the cells live in a 2D ndarray (the "array" attribute); otherwise, they live in a flat
+    array.array, and "array" is None.
+
+    size_x, size_y = size of the grid
+    fill = value to fill the grid with
+    typecode = RG_TYPE_INT8 (default; values from -128 to 127), RG_TYPE_INT16 (values from -32768 to 32767), or
+    RG_TYPE_INT32 (values from -2147483648 to 2147483647)
+    """
+
+    def __init__(self, size_x=9, size_y=9, fill=0, typecode=RG_TYPE_INT8):
+
+        self.size_x = size_x
+        self.size_y = size_y
+        self.typecode = typecode
+
+        if numpy is not None:
+
+            self.array = numpy.full((size_y, size_x), fill, dtype=_RG_DTYPES[typecode])
+
+        else:
+
+            self.array = None
+
+            self._buffer = array.array(typecode, [fill]) * (size_x * size_y)
+            self._offset = 0
+            self._stride = size_x
+
+    @classmethod
+    def _wrap(cls, typecode, ndarray=None, buffer=None, offset=0, stride=0, size_x=0, size_y=0):
+
+        # Makes a RoomGrid around existing storage without copying it (used for views).
+
+        grid = cls.__new__(cls)
+
+        grid.typecode = typecode
+        grid.array = ndarray
+
+        if ndarray is not None:
+
+            grid.size_y, grid.size_x = ndarray.shape
+
+        else:
+
+            grid.size_x = size_x
+            grid.size_y = size_y
+
+            grid._buffer = buffer
+            grid._offset = offset
+            grid._stride = stride
+
+        return grid
+
+    @classmethod
+    def from_list(cls, room_list, typecode=None):
+        """
+        Creates a RoomGrid from a list of lists of ints (a room_list, as the generation functions used to return).
+        If typecode is None, the smallest type that fits every value in the list is used.
+        """
+
+        size_y = len(room_list)
+        size_x = len(room_list[0]) if size_y else 0
+
+        if typecode is None:
+            typecode = _typecode_for(v for row in room_list for v in row)
+
+        if numpy is not None:
+
+            return cls._wrap(typecode, numpy.array(room_list, dtype=_RG_DTYPES[typecode]).reshape((size_y, size_x)))
+
+        buffer = array.array(typecode)
+
+        for row in room_list:
+            buffer.extend(row)
+
+        return cls._wrap(typecode, buffer=buffer, stride=size_x, size_x=size_x, size_y=size_y)
+
+    def to_list(self):
+        """
+        Returns the grid as a list of lists of ints (the legacy room_list format).
+        """
+
+        if self.array is not None:
+            return self.array.tolist()
+
+        return [self.row(y).tolist() for y in range(self.size_y)]
+
+    def copy(self, typecode=None):
+        """
+        Returns a contiguous copy of the grid (or of the view), optionally converting it to another storage type.
+        """
+
+        typecode = self.typecode if typecode is None else typecode
+
+        if self.array is not None:
+            return self._wrap(typecode, self.array.astype(_RG_DTYPES[typecode], copy=True))
+
+        if self._stride == self.size_x and typecode == self.typecode:
+
+            start = self._offset
+            buffer = self._buffer[start:start + self.size_x * self.size_y]
+
+        else:
+
+            buffer = array.array(typecode)
+
+            for y in range(self.size_y):
+                buffer.extend(self.row(y))
+
+        return self._wrap(typecode, buffer=buffer, stride=self.size_x, size_x=self.size_x, size_y=self.size_y)
+
+    def view(self, y, x, size_y, size_x):
+        """
+        Returns a RoomGrid that shares its cells with this one, covering the rectangle starting at row y, column x.
+        Writing to the view writes to this grid.
+        """
+
+        if not (0 <= y and 0 <= x and y + size_y <= self.size_y and x + size_x <= self.size_x):
+            raise IndexError("RoomGrid view is out of bounds")
+
+        if self.array is not None:
+            return self._wrap(self.typecode, self.array[y:y + size_y, x:x + size_x])
+
+        return self._wrap(self.typecode, buffer=self._buffer, offset=self._offset + y * self._stride + x,
+                          stride=self._stride, size_x=size_x, size_y=size_y)
+
+    def row(self, y):
+        """
+        Returns a writable view of row y (an ndarray row with NumPy, or a memoryview without).
+        """
+
+        if self.array is not None:
+            return self.array[y]
+
+        if not 0 <= y < self.size_y:
+            raise IndexError("RoomGrid row index out of range")
+
+        start = self._offset + y * self._stride
+
+        return memoryview(self._buffer)[start:start + self.size_x]
+
+    def get(self, y, x):
+        """
+        Returns the value of the cell at row y, column x as a Python int.
+        """
+
+        if self.array is not None:
+            return self.array.item(y, x)
+
+        return self._buffer[self._offset + y * self._stride + x]
+
+    def set(self, y, x, value):
+        """
+        Sets the cell at row y, column x to value.
+        """
+
+        if self.array is not None:
+            self.array[y, x] = value
+        else:
+            self._buffer[self._offset + y * self._stride + x] = value
+
+    def fill(self, value):
+
+        if self.array is not None:
+
+            self.array.fill(value)
+
+        else:
+
+            for y in range(self.size_y):
+                self.row(y)[:] = array.array(self.typecode, [value]) * self.size_x
+
+    def count(self, value):
+        """
+        Returns how many cells are set to value.
+        """
+
+        if self.array is not None:
+            return int(numpy.count_nonzero(self.array == value))
+
+        return sum(self.row(y).tolist().count(value) for y in range(self.size_y))
+
+    def tobytes(self):
+        """
+        Returns the cells as raw bytes, row by row, in little-endian order (one byte per cell for RG_TYPE_INT8, two for
+        RG_TYPE_INT16, and four for RG_TYPE_INT32).
+        """
+
+        if self.array is not None:
+            return numpy.ascontiguousarray(self.array, dtype=numpy.dtype(_RG_DTYPES[self.typecode]).newbyteorder('<')).tobytes()
+
+        buffer = self.copy()._buffer
+
+        if sys.byteorder == 'big' and self.typecode != RG_TYPE_INT8:
+            buffer.byteswap()
+
+        return buffer.tobytes()
+
+    @classmethod
+    def frombuffer(cls, buffer, size_x, size_y, typecode=RG_TYPE_INT8, offset=0):
+        """
+        Creates a RoomGrid from raw bytes laid out like RoomGrid.tobytes() returns them, starting offset bytes into
+        buffer (any bytes-like object, i.e. bytes, a bytearray, or an mmap). With NumPy, the grid uses the buffer's
+        memory directly, without copying it (so it's read-only if the buffer is); without NumPy, the cells are copied.
+        """
+
+        if numpy is not None:
+
+            dtype = numpy.dtype(_RG_DTYPES[typecode]).newbyteorder('<')
+
+            return cls._wrap(typecode, numpy.frombuffer(buffer, dtype=dtype, count=size_x * size_y,
+                                                        offset=offset).reshape((size_y, size_x)))
+
+        length = size_x * size_y * _RG_SIZES[typecode]
+
+        cells = array.array(typecode)
+        cells.frombytes(bytes(memoryview(buffer)[offset:offset + length]))
+
+        if sys.byteorder == 'big' and typecode != RG_TYPE_INT8:
+            cells.byteswap()
+
+        return cls._wrap(typecode, buffer=cells, stride=size_x, size_x=size_x, size_y=size_y)
+
+    def __len__(self):
+
+        return self.size_y
+
+    def __iter__(self):
+
+        for y in range(self.size_y):
+            yield self.row(y)
+
+    def __getitem__(self, index):
+
+        if isinstance(index, tuple):
+            return self.get(*index)
+
+        if index < 0:
+            index += self.size_y
+
+        return self.row(index)
+
+    def __setitem__(self, index, value):
+
+        if isinstance(index, tuple):
+            self.set(index[0], index[1], value)
+        else:
+            self.row(index)[:] = array.array(self.typecode, value) if self.array is None else value
+
+    def __eq__(self, other):
+
+        if isinstance(other, list):
+            other = RoomGrid.from_list(other)
+
+        if not isinstance(other, RoomGrid):
+            return NotImplemented
+
+        if (self.size_x, self.size_y) != (other.size_x, other.size_y):
+            return False
+
+        return all(self.row(y).tolist() == other.row(y).tolist() for y in range(self.size_y))
+
+    def __repr__(self):
+
+        return 'RoomGrid(' + ',\n         '.join(str(r) for r in self.to_list()) + ')'
+
+
+def _typecode_for(values):
+
+    # Returns the smallest RoomGrid storage type that can hold every value in values.
+
+    values = list(values)
+
+    if not values:
+        return RG_TYPE_INT8
+
+    lowest, highest = min(values), max(values)
+
+    for typecode in _RG_TYPES:
+
+        lo, hi = _RG_RANGES[typecode]
+
+        if lo <= lowest and highest <= hi:
+            return typecode
+
+    raise ValueError('Room grid values have to fit into 32 bits.')
+
+
+def as_grid(room_list):
+    """
+    Returns room_list as a RoomGrid - room_list itself if it already is one, or a converted copy if it's a list of lists.
+    """
+
+    if isinstance(room_list, RoomGrid):
+        return room_list
+
+    return RoomGrid.from_list(room_list)
+
+
+def _working_copy(room_list, values):
+
+    # Returns a new RoomGrid holding room_list's cells, with a storage type wide enough to also hold any of values.
+
+    typecode = _typecode_for(values)
+
+    if not isinstance(room_list, RoomGrid):
+        return RoomGrid.from_list(room_list, _typecode_for([v for row in room_list for v in row] + list(values)))
+
+    typecode = max(typecode, room_list.typecode, key=_RG_TYPES.index)
+
+    return room_list.copy(typecode)
+
+# Random numbers
+
+
+class _GeneratorRandom():
+
+    # Wraps a NumPy Generator so that it can be drawn from like a random.Random.
+
+    def __init__(self, generator):
+
+        self.generator = generator
+
+    def random(self):
+
+        return float(self.generator.random())
+
+    def getrandbits(self, k):
+
+        return int.from_bytes(self.generator.bytes((k + 7) // 8), 'little') >> (-k % 8)
+
+    def randrange(self, start, stop=None):
+
+        if stop is None:
+            start, stop = 0, start
+
+        return int(self.generator.integers(start, stop))
+
+    def randint(self, a, b):
+
+        return self.randrange(a, b + 1)
+
+    def uniform(self, a, b):
+
+        return a + (b - a) * self.random()
+
+    def choice(self, seq):
+
+        return seq[self.randrange(len(seq))]
+
+    def sample(self, population, k):
+
+        return [population[i] for i in self.generator.choice(len(population), k, replace=False).tolist()]
+
+
+def _rng_for(random_seed, rng):
+
+    # Returns the random number generator for a generation function to draw from: rng itself if it's a random.Random,
+    # rng wrapped up to work like one if it's a NumPy Generator, or, if it's None, a new random.Random seeded with
+    # random_seed. The global random module's state is never used or changed, so generation functions can run at the
+    # same time from different threads (or processes), each one reproducible from its own seed or generator.
+
+    if rng is None:
+        return random.Random(random_seed)
+
+    if isinstance(rng, (random.Random, _GeneratorRandom)):
+        return rng
+
+    return _GeneratorRandom(rng)
+
+
+def _fill_random(grid, choices, rng):
+
+    # Fills the RoomGrid with values picked at random from choices, drawing the randomness for the whole grid in one
+    # go (16 random bits per cell). The same rng state gives the same grid with or without NumPy.
+
+    count = grid.size_x * grid.size_y
+
+    if len(choices) == 1 or count == 0:
+        grid.fill(choices[0])
+        return
+
+    bits = rng.getrandbits(16 * count).to_bytes(2 * count, 'little')
+
+    if grid.array is not None:
+
+        picks = (numpy.frombuffer(bits, dtype='<u2').astype(numpy.uint32) * len(choices)) >> 16
+        grid.array[:] = numpy.asarray(choices)[picks].reshape(grid.array.shape)
+
+        return
+
+    values = array.array('H', bits)
+
+    if sys.byteorder == 'big':
+        values.byteswap()
+
+    for y in range(grid.size_y):
+        start = y * grid.size_x
+        grid.row(y)[:] = array.array(grid.typecode, [choices[(v * len(choices)) >> 16]
+                                                     for v in values[start:start + grid.size_x]])
+
+
+# Helper Functions
+
+
+def get_surrounding_cells(room, cell_y, cell_x, ignore=0, edge=0):
+    """
+
+    Author : SolarLune
+    Date Updated : 11/24/13
+
+    Gets and returns the values in the indices in the surrounding cells and count from the room array supplied.
+
+    room = Room array
+    celly, cellx = cell co-ordinates to check around
+    ignore = Value to ignore (not count); If set to None, then no number will be ignored
+
+    edge = What to do when checking cells on the edges of the list.
+
+    0 = Blank; It's assumed the non-existent cell is 0.
+    1 = Void; The non-existent cell's value returns None. This will affect the returned
+        number of surrounding cells accordingly.
+    2 = Extend; It's assumed the non-existent cell is the same as the current number.
+    3 = Wrap; It's assumed the non-existent cell is the same as the cell on the opposite border.
+
+    Returns a dictionary consisting of two keys.
+    "cells" = value returned in the cell directly one value away
+    (i.e. left is one to the left, right is one to the right, etc)
+    "sum" = how many non-zero values were found
+
+    """
+
+    if isinstance(room, RoomGrid):
+
+        get = room.get
+        size_x, size_y = room.size_x, room.size_y
+
+    else:
+
+        get = lambda y, x: room[y][x]
+        size_x, size_y = len(room[cell_y]), len(room)
+
+    if cell_x > 0:
+        left = get(cell_y, cell_x - 1)
+    else:
+        if edge == 0:  # Blank
+            left = 0
+        elif edge == 1:  # Void
+            left = None
+        elif edge == 2:  # Extend
+            left = get(cell_y, cell_x)
+        elif edge == 3:  # Wrap
+            left = get(cell_y, size_x - 1)
+
+    if cell_x < size_x - 1:
+        right = get(cell_y, cell_x + 1)
+    else:
+        if edge == 0:
+            right = 0
+        elif edge == 1:
+            right = None
+        elif edge == 2:
+            right = get(cell_y, cell_x)
+        elif edge == 3:
+            right = get(cell_y, 0)
+
+    if cell_y > 0:
+        up = get(cell_y - 1, cell_x)
+    else:
+        if edge == 0:
+            up = 0
+        elif edge == 1:
+            up = None
+        elif edge == 2:
+            up = get(cell_y, cell_x)
+        elif edge == 3:
+            up = get(size_y - 1, cell_x)
+
+    if cell_y < size_y - 1:
+        down = get(cell_y + 1, cell_x)
+    else:
+        if edge == 0:
+            down = 0
+        elif edge == 1:
+            down = None
+        elif edge == 2:
+            down = get(cell_y, cell_x)
+        elif edge == 3:
+            down = get(0, cell_x)
+
+
+    #print (down)
+
+    cells = [left, right, up, down]
+
+    num = len(cells) - cells.count(ignore) - cells.count(None)
+
+    return ({'cells': {'left': left, 'right': right, 'up': up, 'down': down}, 'num': num})
+
+
+def _neighbor_planes(grid, edge=GSC_EDGE_BLANK):
+
+    # Returns the left, right, up, and down neighbor values of every cell in the RoomGrid, as ndarrays with NumPy or as
+    # lists of row lists without. Cells beyond the border are filled in according to edge (void cells are left as 0).
+
+    if grid.array is not None:
+
+        a = grid.array
+
+        left = numpy.empty_like(a)
+        right = numpy.empty_like(a)
+        up = numpy.empty_like(a)
+        down = numpy.empty_like(a)
+
+        left[:, 1:] = a[:, :-1]
+        right[:, :-1] = a[:, 1:]
+        up[1:] = a[:-1]
+        down[:-1] = a[1:]
+
+        if edge == GSC_EDGE_EXTEND:
+            left[:, 0], right[:, -1], up[0], down[-1] = a[:, 0], a[:, -1], a[0], a[-1]
+        elif edge == GSC_EDGE_WRAP:
+            left[:, 0], right[:, -1], up[0], down[-1] = a[:, -1], a[:, 0], a[-1], a[0]
+        else:
+            left[:, 0], right[:, -1], up[0], down[-1] = 0, 0, 0, 0
+
+        return left, right, up, down
+
+    rows = grid.to_list()
+
+    if edge == GSC_EDGE_EXTEND:
+
+        left = [[r[0]] + r[:-1] for r in rows]
+        right = [r[1:] + [r[-1]] for r in rows]
+        up = [rows[0]] + rows[:-1]
+        down = rows[1:] + [rows[-1]]
+
+    elif edge == GSC_EDGE_WRAP:
+
+        left = [r[-1:] + r[:-1] for r in rows]
+        right = [r[1:] + r[:1] for r in rows]
+        up = rows[-1:] + rows[:-1]
+        down = rows[1:] + rows[:1]
+
+    else:
+
+        blank = [0] * grid.size_x
+
+        left = [[0] + r[:-1] for r in rows]
+        right = [r[1:] + [0] for r in rows]
+        up = [blank] + rows[:-1]
+        down = rows[1:] + [blank]
+
+    return left, right, up, down
+
+
+def get_surrounding_planes(room, ignore=0, edge=GSC_EDGE_BLANK):
+    """
+    Whole-grid version of get_surrounding_cells(); gets the surrounding cells of every cell in the room at once, in a
+    single pass of shifted copies of the grid, rather than one call (and two dictionaries) per cell.
+
+    room = Room array (RoomGrid or list of lists)
+    ignore = Value to ignore (not count); If set to None, then no number will be ignored
+    edge = What to do when checking cells on the edges of the list; one of the GSC_EDGE_xxx constants (see
+    get_surrounding_cells()).
+
+    Returns a dictionary consisting of three keys.
+    "cells" = a dictionary of RoomGrids ("left", "right", "up", and "down"); each holds, for every cell, the value of the
+    cell directly one value away in that direction. With GSC_EDGE_VOID, cells beyond the border read as 0 here.
+    "num" = a RoomGrid of how many of each cell's surrounding cells aren't ignored (void cells are never counted)
+    "void" = a RoomGrid of how many of each cell's surrounding cells were beyond the border with GSC_EDGE_VOID (all 0
+    otherwise)
+    """
+
+    grid = as_grid(room)
+
+    size_x, size_y = grid.size_x, grid.size_y
+
+    left, right, up, down = _neighbor_planes(grid, edge)
+
+    if grid.array is not None:
+
+        num = numpy.zeros((size_y, size_x), dtype=numpy.int8)
+        void = numpy.zeros((size_y, size_x), dtype=numpy.int8)
+
+        for plane in (left, right, up, down):
+            if ignore is None:
+                num += 1
+            else:
+                num += plane != ignore
+
+        if edge == GSC_EDGE_VOID:
+
+            void[:, 0] += 1
+            void[:, -1] += 1
+            void[0] += 1
+            void[-1] += 1
+
+            if ignore is None or ignore != 0:  # Void cells were read as 0, so they were counted above
+                num -= void
+
+        planes = {'left': left, 'right': right, 'up': up, 'down': down}
+
+        return {'cells': {k: RoomGrid._wrap(grid.typecode, planes[k]) for k in planes},
+                'num': RoomGrid._wrap(RG_TYPE_INT8, num),
+                'void': RoomGrid._wrap(RG_TYPE_INT8, void)}
+
+    num = []
+    void = []
+
+    for y in range(size_y):
+
+        if ignore is None:
+            num_row = [4] * size_x
+        else:
+            num_row = [(l != ignore) + (r != ignore) + (u != ignore) + (d != ignore)
+                       for l, r, u, d in zip(left[y], right[y], up[y], down[y])]
+
+        void_row = [0] * size_x
+
+        if edge == GSC_EDGE_VOID:
+
+            for x in range(size_x):
+                void_row[x] = (x == 0) + (x == size_x - 1) + (y == 0) + (y == size_y - 1)
+
+            if ignore is None or ignore != 0:
+                num_row = [n - v for n, v in zip(num_row, void_row)]
+
+        num.append(num_row)
+        void.append(void_row)
+
+    return {'cells': {'left': RoomGrid.from_list(left, grid.typecode), 'right': RoomGrid.from_list(right, grid.typecode),
+                      'up': RoomGrid.from_list(up, grid.typecode), 'down': RoomGrid.from_list(down, grid.typecode)},
+            'num': RoomGrid.from_list(num, RG_TYPE_INT8),
+            'void': RoomGrid.from_list(void, RG_TYPE_INT8)}
+
+
+def get_cell_shapes(room, ignore=0, edge=GSC_EDGE_BLANK, eight_way=False):
+    """
+    Works out which floor piece shape (end, straight, corner, T, or 4-way) each cell of the room needs, and how far it's
+    turned, all at once - each cell's open neighbors are packed into a bitmask (see the RLG_MASK_xxx constants), which
+    is looked up in a precomputed table. This is what populate() spawns pieces from, but nothing gets spawned here, so
+    it's also useful for tools, previews, or picking pieces yourself.
+
+    room = Room array (RoomGrid or list of lists)
+    ignore = Value of cells that are empty (that aren't open neighbors, and that get the RLG_POP_CEIL shape)
+    edge = What to do when checking cells on the edges of the list; one of the GSC_EDGE_xxx constants (see
+    get_surrounding_cells()). Cells beyond the border with GSC_EDGE_VOID are never open.
+    eight_way = If the mask should also include the diagonal neighbors (RLG_MASK_UP_LEFT, etc.) for 8-bit (47-tile)
+    autotiling; a diagonal only counts when both of the neighbors beside it are open, too. The shapes and rotations
+    are the same either way.
+
+    Returns a dictionary consisting of three RoomGrids.
+    "mask" = each cell's neighbor bitmask
+    "shape" = each cell's RLG_POP_xxx shape (cells with no open neighbors are 4-way pieces)
+    "rotation" = how many quarter turns each cell's piece is turned - an index into RLG_ROTATIONS, or -1 for pieces that
+    aren't turned (4-way and ceiling pieces)
+    """
+
+    grid = as_grid(room)
+
+    left, right, up, down = _neighbor_planes(grid, edge)
+
+    if eight_way:
+
+        if grid.array is not None:
+            up_grid, down_grid = RoomGrid._wrap(grid.typecode, up), RoomGrid._wrap(grid.typecode, down)
+        else:
+            up_grid, down_grid = RoomGrid.from_list(up, grid.typecode), RoomGrid.from_list(down, grid.typecode)
+
+        up_left, up_right = _neighbor_planes(up_grid, edge)[:2]
+        down_left, down_right = _neighbor_planes(down_grid, edge)[:2]
+
+    if grid.array is not None:
+
+        a = grid.array
+
+        if ignore is None:
+            opens = [numpy.ones(a.shape, dtype=bool) for p in range(4)]
+        else:
+            opens = [p != ignore for p in (left, right, up, down)]
+
+        if edge == GSC_EDGE_VOID:
+            opens[0][:, 0], opens[1][:, -1], opens[2][0], opens[3][-1] = False, False, False, False
+
+        mask = numpy.zeros(a.shape, dtype=numpy.int16 if eight_way else numpy.int8)
+
+        for bit, o in zip((RLG_MASK_LEFT, RLG_MASK_RIGHT, RLG_MASK_UP, RLG_MASK_DOWN), opens):
+            mask[o] |= bit
+
+        shape = _SHAPE_TABLE_NP[mask & 15]
+        rotation = _ROTATION_TABLE_NP[mask & 15]
+
+        if eight_way:
+
+            l, r, u, d = opens
+
+            for bit, plane, side, other in ((RLG_MASK_UP_LEFT, up_left, u, l), (RLG_MASK_UP_RIGHT, up_right, u, r),
+                                            (RLG_MASK_DOWN_LEFT, down_left, d, l),
+                                            (RLG_MASK_DOWN_RIGHT, down_right, d, r)):
+                mask[side & other & (True if ignore is None else plane != ignore)] |= bit
+
+        if ignore is not None:
+            empty = a == ignore
+            shape[empty] = RLG_POP_CEIL
+            rotation[empty] = -1
+
+        return {'mask': RoomGrid._wrap(RG_TYPE_INT16 if eight_way else RG_TYPE_INT8, mask),
+                'shape': RoomGrid._wrap(RG_TYPE_INT8, shape),
+                'rotation': RoomGrid._wrap(RG_TYPE_INT8, rotation)}
+
+    size_x, size_y = grid.size_x, grid.size_y
+
+    mask = []
+    shape = []
+    rotation = []
+
+    for y in range(size_y):
+
+        row = grid.row(y)
+
+        if ignore is None:
+            opens = [[True] * size_x for p in range(4)]
+        else:
+            opens = [[v != ignore for v in p[y]] for p in (left, right, up, down)]
+
+        if edge == GSC_EDGE_VOID:
+
+            opens[0][0], opens[1][-1] = False, False
+
+            if y == 0:
+                opens[2] = [False] * size_x
+            if y == size_y - 1:
+                opens[3] = [False] * size_x
+
+        l, r, u, d = opens
+
+        mask_row = [a | (b << 1) | (c << 2) | (e << 3) for a, b, c, e in zip(l, r, u, d)]
+
+        shape_row = [_SHAPE_TABLE[m] for m in mask_row]
+        rotation_row = [_ROTATION_TABLE[m] for m in mask_row]
+
+        if eight_way:
+
+            for bit, plane, side, other in ((RLG_MASK_UP_LEFT, up_left, u, l), (RLG_MASK_UP_RIGHT, up_right, u, r),
+                                            (RLG_MASK_DOWN_LEFT, down_left, d, l),
+                                            (RLG_MASK_DOWN_RIGHT, down_right, d, r)):
+                for x in range(size_x):
+                    if side[x] and other[x] and (ignore is None or plane[y][x] != ignore):
+                        mask_row[x] |= bit
+
+        if ignore is not None:
+
+            for x in range(size_x):
+                if row[x] == ignore:
+                    shape_row[x] = RLG_POP_CEIL
+                    rotation_row[x] = -1
+
+        mask.append(mask_row)
+        shape.append(shape_row)
+        rotation.append(rotation_row)
+
+    return {'mask': RoomGrid.from_list(mask, RG_TYPE_INT16 if eight_way else RG_TYPE_INT8),
+            'shape': RoomGrid.from_list(shape, RG_TYPE_INT8),
+            'rotation': RoomGrid.from_list(rotation, RG_TYPE_INT8)}
+
+
+# ~~~~ Generation Functions ~~~~~
+
+def gen_line(size_x=9, size_y=9, line_y=None, random_seed=None, line_types=[1], fill_types=[2], empty_types=[0], room_list=None,
+             rng=None):
+    """
+    Generates a map split by a random, wandering line; cells above the line are filled with fill_types, the line with
+    line_types, and the rest with empty_types.
+
+    rng = the random number generator to draw from - a random.Random or a NumPy Generator - instead of a new one seeded with
+    random_seed. The global random module is never touched, so generation can run from several threads at once.
+    """
+
+    rng = _rng_for(random_seed, rng)
+
+    if room_list is None:
+
+        room = RoomGrid(size_x, size_y, typecode=_typecode_for(line_types + fill_types + empty_types))
+
+        _fill_random(room, empty_types, rng)  # Create empty rooms
+
+    else:
+
+        room = _working_copy(room_list, line_types + fill_types)
+
+    if line_y is None:
+
+        ly = size_y // 2 + rng.randint(-size_y // 4, size_y // 4)
+
+    else:
+
+        ly = line_y
+
+    for x in range(len(room)):
+
+        for y in range(len(room[x])):
+
+            if y == ly:
+
+                room.set(y, x, rng.choice(line_types))
+
+            elif y < ly:
+
+                room.set(y, x, rng.choice(fill_types))
+
+        r = rng.random
+        ly -= int(round(r()))
+        ly += int(round(r()))
+
+        if ly < 0:
+            ly = 0
+
+        elif ly > len(room) - 1:
+            ly = len(room) - 1
+
+    return room
+
+
+def gen_growth(size_x=9, size_y=9, maxnum=0, random_seed=None, must_connect=1, maxcon=0, roomtypes=[1], room_list=None,
+               growth_style=GG_GROWTH_STYLE_RANDOM, rng=None):
+    """
+
+        2D RANDOM ROOM GENERATOR
+
+        Author: SolarLune
+        Date Updated: 6/24/11
+
+        xsize = X-size of the randomly generated room
+
+        size_y = Y-size of the randomly generated room
+
+        Note that if you use an even number, then there's no middle cell, so you can't be exactly sure which cell WILL be filled.
+
+        maxnum = Maximum number of rooms; by default will make half of the total rooms populated (i.e. 5x5 = 25 / 2 = ~13)
+
+        random_seed = Random seed value; this will (hopefully) make it so that each randomly generated map can be the same with a specific seed
+
+        maxcon = Maximum connections each room can have. Hallways can only have one other connection,
+        for example, and the default is 0, which is as many as possible (yes, hallways actually have two,
+        but each hallway thinks it's the last one, basically)
+
+        roomtypes = Room types (for example, you might want some rooms to be sand, others rock, etc.); basically, the
+        generation will contain random selections of these numbers. So, if you wanted a map of sand, grass, and concrete,
+        you could make a list of three numbers, and replace those numbers with the correct values later on
+
+        room_list = A previous room list (maybe you have a list that you got and want to add on values, or change the theme by using the same seed
+        as before and using different 'roomtypes'. Beware - ensuring that the room_list is the correct size is up to you.
+
+        growth_style = determines how cells to fill are picked.
+
+        GG_GROWTH_STYLE_RANDOM = Random cells are picked from the whole map until one is found that can be filled. This
+        can take a lot of tries (and time) on large or sparse maps; it's the original style, and so the default.
+
+        GG_GROWTH_STYLE_FRONTIER = Random cells are picked only from the "frontier" - the empty cells that border the
+        filled ones (or from all of the empty cells if must_connect is off). Every pick fills a cell (or rules one out
+        for good because of maxcon), so the generation time only depends on how many cells get filled. Note that this
+        gives different maps than GG_GROWTH_STYLE_RANDOM for the same seed.
+
+        rng = the random number generator to draw from - a random.Random or a NumPy Generator - instead of a new one
+        seeded with random_seed. The global random module is never touched, so generation can run from several
+        threads at once.
+    """
+
+    currentnum = 0
+
+    if room_list is None:
+
+        room = RoomGrid(size_x, size_y, typecode=_typecode_for(roomtypes))  # Create empty rooms
+
+    else:
+
+        room = _working_copy(room_list, roomtypes)
+
+        currentnum = room.size_x * room.size_y - room.count(0)  # Add number of occupied rooms (not 0)
+
+    #### CELL GENERATION ####
+
+    rng = _rng_for(random_seed, rng)
+
+    if must_connect and currentnum == 0:
+        middley = math.floor(size_y / 2.0)  # Set the middle cell to be filled
+        middlex = math.floor(size_x / 2.0)
+        room.set(middley, middlex, rng.choice(roomtypes))
+
+        currentnum += 1
+
+    if maxnum > 0:
+        maxsize = maxnum
+    else:
+        maxsize = (size_x * size_y) / 2
+
+    if growth_style == GG_GROWTH_STYLE_FRONTIER:
+
+        _grow_frontier(room, currentnum, maxsize, must_connect, maxcon, roomtypes, rng)
+
+        return room
+
+    rlgpass = 0  # Failsafe
+
+    while (currentnum < maxsize):
+
+        rlgpass += 1
+        if rlgpass > 100000:  # If the number of passes exceeds a certain amount, it breaks out; unnecessary now
+            currentnum = maxsize
+            break
+
+        randomy = math.floor(rng.random() * size_y)  # Choose a random cell
+        randomx = math.floor(rng.random() * size_x)
+
+        if room.get(randomy, randomx) == 0:  # Don't set a cell more than once
+
+            if must_connect:
+
+                sur = get_surrounding_cells(room, randomy, randomx)
+
+                cellaround = 0  # If there's a connection around the current cell
+
+                for c in sur['cells']:
+                    cell = sur['cells'][c]
+                    if cell != 0 and cell != None:
+                        cellaround = 1  # If there's another cell surrounding this one that isn't 0 or None
+
+                if sur['num'] > maxcon and maxcon > 0:
+                    pass
+
+                elif cellaround:
+                    room.set(randomy, randomx, rng.choice(roomtypes))
+                    currentnum += 1
+
+            else:
+                room.set(randomy, randomx, rng.choice(roomtypes))
+                currentnum += 1
+
+    #print ('Room:')
+
+    #for y in room:		# Quickie room debug
+    #	print (y)
+
+    return room
+
+
+def _grow_frontier(room, currentnum, maxsize, must_connect, maxcon, roomtypes, rng):
+
+    # Fills cells of the room (in place) picked at random from the frontier of empty cells around the filled ones until
+    # maxsize cells are filled or there's nowhere left to grow. Cells are tracked by their flat index (y * size_x + x);
+    # the frontier is a list for random picks plus a dictionary of where each cell is in it, for O(1) removal.
+
+    size_x, size_y = room.size_x, room.size_y
+
+    frontier = []
+    where = {}
+
+    def add(i):
+
+        if i not in where:
+            where[i] = len(frontier)
+            frontier.append(i)
+
+    def remove(i):
+
+        k = where.pop(i)
+        last = frontier.pop()
+
+        if last != i:  # Move the last cell into the hole
+            frontier[k] = last
+            where[last] = k
+
+    def filled_neighbors(y, x):
+
+        return ((x > 0 and room.get(y, x - 1) != 0) + (x < size_x - 1 and room.get(y, x + 1) != 0) +
+                (y > 0 and room.get(y - 1, x) != 0) + (y < size_y - 1 and room.get(y + 1, x) != 0))
+
+    if must_connect:
+
+        num = get_surrounding_planes(room)['num'].to_list()
+
+        for y in range(size_y):
+            row = room.row(y).tolist()
+            for x in range(size_x):
+                if row[x] == 0 and num[y][x] > 0:
+                    add(y * size_x + x)
+
+    else:
+
+        for y in range(size_y):
+            row = room.row(y).tolist()
+            for x in range(size_x):
+                if row[x] == 0:
+                    add(y * size_x + x)
+
+    while currentnum < maxsize and frontier:
+
+        i = frontier[rng.randrange(len(frontier))]
+        y, x = divmod(i, size_x)
+
+        remove(i)
+
+        if must_connect and maxcon > 0 and filled_neighbors(y, x) > maxcon:
+            continue  # Neighbors never get emptied, so this cell can never be filled; it's off the frontier for good
+
+        room.set(y, x, rng.choice(roomtypes))
+        currentnum += 1
+
+        if must_connect:
+
+            if x > 0 and room.get(y, x - 1) == 0:
+                add(i - 1)
+            if x < size_x - 1 and room.get(y, x + 1) == 0:
+                add(i + 1)
+            if y > 0 and room.get(y - 1, x) == 0:
+                add(i - size_x)
+            if y < size_y - 1 and room.get(y + 1, x) == 0:
+                add(i + size_x)
+
+    return currentnum
+
+
+def _place_nodes_poisson(maplist, nodelist, count, dist, nodetypes, rng, tries=30):
+
+    # Returns up to count new node positions ((y, x) tuples) for the RoomGrid, at least dist cells away (Chebyshev
+    # distance) from each other and from the nodes in nodelist, and not on cells of nodetypes. The samples are spaced
+    # out further than dist where the map has room for it, so that only around three times count samples are made
+    # (rather than saturating the map at dist, which costs more the bigger the map is, however few nodes are needed);
+    # the spacing's halved down to dist if that turns out to leave fewer than count.
+
+    if count <= 0:
+        return []
+
+    spacing = max(dist, int(math.sqrt(maplist.size_x * maplist.size_y / (count * 3.0))))
+
+    while True:
+
+        samples = _poisson_samples(maplist, nodelist, spacing, nodetypes, rng, tries)
+
+        if len(samples) >= count or spacing == dist:
+            break
+
+        spacing = max(dist, spacing // 2)
+
+    if len(samples) < count:
+        print("WARNING: Only " + str(len(samples)) + " of " + str(count) + " nodes fit with a spacing of " + str(dist - 1))
+        return samples
+
+    return rng.sample(samples, count)
+
+
+def _poisson_samples(maplist, nodelist, dist, nodetypes, rng, tries=30):
+
+    # Returns new positions that fill the RoomGrid, at least dist cells away from each other and from the nodes in
+    # nodelist (see _place_nodes_poisson()). The map is Poisson-disk sampled with Bridson's algorithm; with background
+    # cells dist wide, no two samples can share a cell, so each candidate only has to be checked against the nodes in
+    # the 3x3 background cells around it.
+
+    size_x, size_y = maplist.size_x, maplist.size_y
+
+    get = maplist.get
+
+    background_x = size_x // dist + 3  # Padded by a cell on each side, so neighbors never need bounds checks
+    background = [[] for i in range(background_x * (size_y // dist + 3))]  # Nodes in each background cell
+
+    active = []
+    samples = []
+
+    def fits(y, x):
+
+        if not (0 <= y < size_y and 0 <= x < size_x) or get(y, x) in nodetypes:
+            return False
+
+        b = (y // dist + 1) * background_x + x // dist + 1
+
+        for row_start in (b - background_x - 1, b - 1, b + background_x - 1):
+            for cell in background[row_start:row_start + 3]:
+                for other in cell:
+                    if abs(other[0] - y) < dist and abs(other[1] - x) < dist:
+                        return False
+
+        return True
+
+    def add(node, new=True):
+
+        background[(node[0] // dist + 1) * background_x + node[1] // dist + 1].append(node)
+        active.append(node)
+
+        if new:
+            samples.append(node)
+
+    for node in nodelist:
+        add(node, False)
+
+    for i in range(size_x * size_y):  # Start from a random spot (if there's any room at all)
+
+        start = (rng.randrange(size_y), rng.randrange(size_x))
+
+        if fits(*start):
+            add(start)
+            break
+
+    reach = dist * 2 - 1
+    span = reach * 2 + 1
+
+    r = rng.random  # Much quicker than randint() for the number of draws made here
+
+    while active:
+
+        k = rng.randrange(len(active))
+        y, x = active[k]
+
+        for t in range(tries):
+
+            dy = int(r() * span) - reach  # Somewhere between dist and dist * 2 away
+            dx = int(r() * span) - reach
+
+            if abs(dy) < dist and abs(dx) < dist:
+                continue
+
+            if fits(y + dy, x + dx):
+                add((y + dy, x + dx))
+                break
+
+        else:
+
+            active[k] = active[-1]  # Nothing fits around this sample anymore
+            active.pop()
+
+    return samples
+
+
+_room_shapes = {}  # Cached room shapes for _carve_room(), by (room size, room style)
+
+
+def _room_shape(room_size, room_style):
+
+    # Returns the shape of a room as a list of (row offset, half width) spans; round rooms cover the cells within
+    # room_size of the node, square ones the cells less than room_size away on both axes.
+
+    key = (room_size, room_style)
+
+    if key not in _room_shapes:
+
+        if room_style == GN_ROOM_STYLE_ROUND:
+            spans = [(dy, int(math.sqrt(room_size * room_size - dy * dy))) for dy in range(-room_size, room_size + 1)]
+        else:
+            spans = [(dy, room_size - 1) for dy in range(-room_size + 1, room_size)]
+
+        mask = None
+
+        if numpy is not None:  # The same shape as a boolean mask, to stamp into ndarrays in one go
+
+            radius = spans[-1][0]
+            mask = numpy.zeros((radius * 2 + 1, radius * 2 + 1), dtype=bool)
+
+            for dy, half in spans:
+                mask[dy + radius, radius - half:radius + half + 1] = True
+
+        _room_shapes[key] = (spans, mask)
+
+    return _room_shapes[key]
+
+
+def _carve_room(maplist, y, x, room_size, room_style, value):
+
+    # Sets the cells of the room around (y, x) to value, touching only the room's bounding box.
+
+    spans, mask = _room_shape(room_size, room_style)
+
+    radius = spans[-1][0]
+
+    y0, y1 = max(y - radius, 0), min(y + radius + 1, maplist.size_y)
+    x0, x1 = max(x - radius, 0), min(x + radius + 1, maplist.size_x)
+
+    if y0 >= y1 or x0 >= x1:
+        return
+
+    if maplist.array is not None:
+
+        box = maplist.array[y0:y1, x0:x1]
+        box[mask[y0 - y + radius:y1 - y + radius, x0 - x + radius:x1 - x + radius]] = value
+
+        return
+
+    for dy, half in spans:
+
+        if 0 <= y + dy < maplist.size_y:
+
+            left, right = max(x - half, 0), min(x + half + 1, maplist.size_x)
+
+            if left < right:
+                maplist.view(y + dy, left, 1, right - left).fill(value)
+
+
+def _carve_hall(maplist, node, destnode, straight_halls, nodetypes, halltypes, rng):
+
+    # Carves a hall of halltypes from node to destnode (both (y, x) tuples), and returns if it made it there.
+
+    size_x, size_y = maplist.size_x, maplist.size_y
+
+    diff = mathutils.Vector(destnode) - mathutils.Vector(node)
+
+    if straight_halls:
+
+        target = list(node)
+
+    else:
+
+        target = mathutils.Vector(node)
+        axis_x = 1
+
+    for x in range(1000):  # Can make a 10000 unit path
+
+        if straight_halls:
+
+            if destnode[0] > target[0]:
+                target[0] += 1
+            elif destnode[0] < target[0]:
+                target[0] -= 1
+            elif destnode[1] > target[1]:
+                target[1] += 1
+            elif destnode[1] < target[1]:
+                target[1] -= 1
+
+        else:
+
+            axis_x = not axis_x
+
+            if axis_x:
+                target.x += diff.normalized().x
+            else:
+                target.y += diff.normalized().y
+
+        target_rnd = (int(clamp(round(target[0]), 0, size_y - 1)),
+                      int(clamp(round(target[1]), 0, size_x - 1)))
+
+        if target_rnd == destnode:  # Destination
+
+            maplist.set(destnode[0], destnode[1], rng.choice(nodetypes))  # Make sure we didn't overwrite it
+            maplist.set(node[0], node[1], rng.choice(nodetypes))
+
+            return True
+
+        else:
+
+            if not maplist.get(target_rnd[0], target_rnd[1]) in nodetypes:  # Not occupied
+                maplist.set(target_rnd[0], target_rnd[1], rng.choice(halltypes))
+
+    return False
+
+
+def _spanning_connections(nodes, rng, extra_connections=0.0):
+
+    # Returns (node, other node) pairs that join all of the nodes (a list of (y, x) tuples) together along a minimum
+    # spanning tree, plus extra_connections times as many pairs again from the leftover candidates (for loops).
+    # Candidate pairs come from bucketing the nodes into a grid with about one node per bucket and pairing up the nodes
+    # in neighboring buckets; Kruskal's algorithm then picks the tree from those. If the candidates leave the nodes in
+    # separate groups, buckets further and further apart are paired up until everything's connected.
+
+    count = len(nodes)
+
+    if count < 2:
+        return []
+
+    min_y = min(n[0] for n in nodes)
+    min_x = min(n[1] for n in nodes)
+    area = (max(n[0] for n in nodes) - min_y + 1) * (max(n[1] for n in nodes) - min_x + 1)
+
+    cell = max(1, int(math.sqrt(area / count)))
+
+    buckets = {}
+
+    for i, n in enumerate(nodes):
+        buckets.setdefault(((n[0] - min_y) // cell, (n[1] - min_x) // cell), []).append(i)
+
+    keys = sorted(buckets.keys())
+
+    parent = list(range(count))  # Union-find forest over the node indices
+
+    def find(i):
+
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+
+        return i
+
+    def bucket_pairs(near, far):
+
+        # Yields each pair of occupied buckets whose distance apart (in buckets, on the furthest axis) is in (near, far]
+        # once, by looking up the offsets around each bucket, or by going through all pairs if that's fewer lookups.
+
+        if (far * 2 + 1) ** 2 <= len(keys):
+
+            for by, bx in keys:
+                for dy in range(-far, far + 1):
+                    for dx in range(-far, far + 1):
+                        if max(abs(dy), abs(dx)) > near and (dy, dx) > (0, 0) and (by + dy, bx + dx) in buckets:
+                            yield (by, bx), (by + dy, bx + dx)
+
+        else:
+
+            for k, a in enumerate(keys):
+                for b in keys[k + 1:]:
+                    if near < max(abs(a[0] - b[0]), abs(a[1] - b[1])) <= far:
+                        yield a, b
+
+    def candidates(near, far):
+
+        edges = []
+
+        if near == 0:  # Pairs within the same bucket, too
+            for members in buckets.values():
+                for k, i in enumerate(members):
+                    for j in members[k + 1:]:
+                        edges.append(((nodes[i][0] - nodes[j][0]) ** 2 + (nodes[i][1] - nodes[j][1]) ** 2, i, j))
+
+        for a, b in bucket_pairs(near, far):
+            for i in buckets[a]:
+                for j in buckets[b]:
+                    if near == 0 or find(i) != find(j):
+                        edges.append(((nodes[i][0] - nodes[j][0]) ** 2 + (nodes[i][1] - nodes[j][1]) ** 2, i, j))
+
+        edges.sort()
+
+        return edges
+
+    tree = []
+    spare = []  # Candidates left out of the tree, for the extra connections
+
+    near, far = 0, 1
+
+    while len(tree) < count - 1:
+
+        for d, i, j in candidates(near, far):
+
+            root_i, root_j = find(i), find(j)
+
+            if root_i != root_j:
+                parent[root_i] = root_j
+                tree.append((nodes[i], nodes[j]))
+            elif near == 0:
+                spare.append((nodes[i], nodes[j]))
+
+        near, far = far, far * 2
+
+    extra = min(int(round(extra_connections * len(tree))), len(spare))
+
+    return tree + rng.sample(spare, extra)
+
+
+def gen_nodes(size_x=9, size_y=9, nodecount=None, spacing=1, random_seed=None, nodetypes=[1], halltypes=[1], empty_types=[0],
+             straight_halls=False, connection_style=GN_CONNECTION_STYLE_ONE,
+             room_style=GN_ROOM_STYLE_SQUARE, min_room_size=2, max_room_size=5, room_list=None,
+             node_placement=GN_NODE_PLACEMENT_RANDOM, extra_connections=0.0, rng=None):
+    """
+
+    This method of random generation spawns several nodes, and then connects those nodes with halls.
+
+    x, size_y = size of the generated list
+
+    nodecount = number of nodes to spawn; defaults to half of the width of the room.
+
+    spacing = spawn nodes with a minimum number of >spacing< blank nodes between them (both x and y axes individually).
+    An example would be a node at [4, 4] and another one at [18, 5]. If spacing == 1, then that won't work, since
+    5 - 4 = 1 node difference.
+    if spacing == 0 (default), distance has no bearing on where nodes are spawned
+
+    Note! If spacing is too large and the room has too small a size, it will basically be tried for, but otherwise
+    the room will generate however it can. Use small spacing amounts and large rooms.
+
+    random_seed = random seed for spawning the same list each time
+
+    nodetypes = a list of different (randomly chosen) numbers that can spawn for the nodes separating halls
+
+    halltypes = a list of different (randomly chosen) numbers that can spawn for the halls in-between nodes
+
+    empty_types = a list of different (randomly chosen) numbers that can spawn for the non-hall or node spots
+
+    straight_halls = determines if the hallways basically only bend once max, or if they "stair-step" between nodes
+
+    connection_style = determines how the nodes connect to each other.
+
+    GN_CONNECTION_STYLE_ONE = All nodes each connect to one other randomly chosen node
+    (this will result in the map being connected correctly, of course)
+
+    GN_CONNECTION_STYLE_ALL = All nodes connect to each other. For an example, think of a square with four points -
+    each point connects	to the three other points.
+
+    GN_CONNECTION_STYLE_HUB = All nodes connect to one other node specifically; i.e., if you have 10 nodes, one
+    node will connect to all other nodes, and every other node will only connect to the previous one
+
+    GN_CONNECTION_STYLE_MST = Nodes connect to nearby nodes so that the whole map is connected with the shortest halls
+    overall (a minimum spanning tree over the close pairs of nodes). Unlike ALL, this stays quick with lots of nodes.
+
+    room_style = determines how the nodes form rooms.
+
+    GN_ROOM_STYLE_ROUND = Round rooms
+    GN_ROOM_STYLE_SQUARE = Octopus-shaped rooms
+
+    min_room_size, max_room_size = determines how large each node room can be minimum and maximum
+
+    room_list = preexisting list to use; numbers that are specified in nodetypes are interpreted as nodes, numbers
+    that are in halltypes are interpreted as halls, and numbers that are in empty_types are interpreted as "empties".
+    The nodecount you specify is added to the existing nodes you have pre-existing in the room list.
+
+    node_placement = determines how the nodes are placed.
+
+    GN_NODE_PLACEMENT_RANDOM = Random spots are tried for each node (up to 1000 times), and checked against every other
+    node; if no spot can be found, the spacing is lowered until one is. This is the original style, and so the default.
+
+    GN_NODE_PLACEMENT_POISSON = The map is Poisson-disk sampled (Bridson's algorithm, on a background grid), and the
+    nodes are picked from the samples. Here, spacing is the Chebyshev distance - nodes need >spacing< blank cells between
+    them on at least one axis, so [4, 4] and [18, 5] are fine with a spacing of 1. This takes time in line with the size of
+    the map, however many nodes there are, and the spacing is never lowered - if fewer nodes fit than nodecount asks for,
+    a warning is printed and the nodes that fit are used.
+
+    extra_connections = with GN_CONNECTION_STYLE_MST, how many extra halls to make on top of the spanning tree (so the map
+    has loops), as a fraction of the halls in the tree; i.e. 0.25 with 41 nodes (and so 40 halls) makes 10 more.
+
+    rng = the random number generator to draw from - a random.Random or a NumPy Generator - instead of a new one seeded with
+    random_seed. The global random module is never touched, so generation can run from several threads at once.
+    """
+
+    rng = _rng_for(random_seed, rng)
+
+    if room_list is not None:
+
+        if not isinstance(room_list, (list, RoomGrid)):
+            print("ERROR: Provided room_list is not a list or RoomGrid")
+
+            return []
+
+        maplist = _working_copy(room_list, nodetypes + halltypes)
+        middle = [size_x // 2, size_y // 2]
+
+        size_y = maplist.size_y
+        size_x = maplist.size_x
+
+    else:
+
+        maplist = RoomGrid(size_x, size_y, typecode=_typecode_for(nodetypes + halltypes + empty_types))
+
+        _fill_random(maplist, empty_types, rng)
+
+        middle = [size_x // 2, size_y // 2]
+
+    #maplist[middle[1]][middle[0]] = rng.choice(
+
+    nodelist = []  # List of nodes
+    toconnect = {}  # List of nodes that are still up for connections and their connection counts
+
+    if nodecount is None:
+        ndc = int(size_x / 2)
+    else:
+        ndc = nodecount
+
+    if room_list is not None:
+
+        list_node_count = 0
+
+        for c in range(size_y):
+            for x in range(size_x):
+                if maplist.get(c, x) in nodetypes:
+                    node = (c, x)
+                    nodelist.append(node)
+                    toconnect[node] = []
+
+                    list_node_count += 1
+
+    if node_placement == GN_NODE_PLACEMENT_POISSON:
+
+        for node in _place_nodes_poisson(maplist, nodelist, ndc, max(spacing, 0) + 1, nodetypes, rng):
+
+            nodelist.append(node)
+            toconnect[node] = []
+
+            maplist.set(node[0], node[1], rng.choice(nodetypes))
+
+    else:
+
+        for n in range(ndc):  # Generate nodes
+
+            node = None
+
+            if spacing <= 0:
+
+                while (node is None):
+
+                    cy = rng.choice(range(size_y))
+                    cx = rng.choice(range(size_x))
+
+                    #if maplist[cy][cx] in empty_types:
+                    if not maplist.get(cy, cx) in nodetypes:
+                        node = (cy, cx)
+
+                        nodelist.append(node)
+                        toconnect[node] = []  # What nodes the node is connected to
+
+            else:
+
+                for dist in range(spacing + 1, -1,
+                                  -1):  # If you can't find a node at the specified minimum distance, then search at a closer distance
+
+                    for i in range(1000):  # Set a limit so that it doesn't hang the game :/
+
+                        cy = rng.choice(range(size_y))
+                        cx = rng.choice(range(size_x))
+
+                        #if maplist[cy][cx] in empty_types or maplist[cy][cx] in halltypes:
+                        if not maplist.get(cy, cx) in nodetypes:
+                            node = (cy, cx)
+
+                            for other in nodelist:
+                                if other != node:
+
+                                    diffx = abs(node[1] - other[1])
+                                    diffy = abs(node[0] - other[0])
+
+                                    if diffx < dist or diffy < dist:  # Discard the node placement if it's too close to another node
+                                        node = None  # And find another node placement (in the same 100x for loop above)
+                                        break
+
+                        if node != None:
+                            nodelist.append(node)
+                            toconnect[node] = []
+                            break
+
+                    if node != None:
+                        break
+
+            maplist.set(node[0], node[1], rng.choice(nodetypes))
+
+    if max_room_size > 0:  # Create rooms
+
+        for n in nodelist:
+
+            room_size = int(rng.uniform(min_room_size, max_room_size))
+
+            if room_size > 0:
+
+                _carve_room(maplist, n[0], n[1], room_size, room_style, maplist.get(n[0], n[1]))
+
+    if len(nodelist) <= 1:
+        print("ERROR: nodecount needs to be larger than 1")
+        return
+
+    if connection_style == GN_CONNECTION_STYLE_HUB:
+        connection_list = [rng.choice(list(toconnect.keys()))]
+
+    if connection_style == GN_CONNECTION_STYLE_MST:
+
+        for node, destnode in _spanning_connections(list(toconnect.keys()), rng, extra_connections):
+
+            if _carve_hall(maplist, node, destnode, straight_halls, nodetypes, halltypes, rng):
+
+                toconnect[node].append(destnode)
+                toconnect[destnode].append(node)
+
+    else:
+
+        for node in list(toconnect.keys()):  # Connect nodes
+
+            destnode = None
+
+            while destnode is None:  # Find a destination node
+
+                if len(toconnect[node]) >= len(toconnect.keys()) - 1:  # Connected to all available nodes
+
+                    break
+
+                else:
+
+                    if connection_style == GN_CONNECTION_STYLE_ONE:
+                        connection_list = [rng.choice(list(toconnect.keys()))]  # Changes with connection_style
+                    elif connection_style == GN_CONNECTION_STYLE_ALL:
+                        connection_list = [c for c in
+                                           toconnect.keys()]  #[rng.choice(list(toconnect.keys()))] # Changes with connection_style
+
+                    if connection_style == GN_CONNECTION_STYLE_HUB and connection_list[
+                        0] == node:  # If you're set to HUB connection and the node selected is you,
+                        break  # Break out of the while loop
+
+                    for dn in connection_list:
+
+                        if dn != node and not dn in toconnect[node]:
+
+                            destnode = dn
+
+                            if _carve_hall(maplist, node, destnode, straight_halls, nodetypes, halltypes, rng):
+
+                                toconnect[tuple(node)].append(destnode)
+                                toconnect[tuple(destnode)].append(node)
+
+    return (maplist)
+
+
+def _random_mask(size_x, size_y, chance, rng):
+
+    # Returns a grid of bools (an ndarray with NumPy, a list of row lists without) that are True with the given chance,
+    # drawing 16 random bits per cell in one go like _fill_random(), so it's the same with or without NumPy.
+
+    count = size_x * size_y
+
+    threshold = int(round(chance * 65536))
+
+    bits = rng.getrandbits(16 * count).to_bytes(2 * count, 'little') if count else b''
+
+    if numpy is not None:
+        return (numpy.frombuffer(bits, dtype='<u2') < threshold).reshape((size_y, size_x))
+
+    values = array.array('H', bits)
+
+    if sys.byteorder == 'big':
+        values.byteswap()
+
+    return [[v < threshold for v in values[y * size_x:(y + 1) * size_x]] for y in range(size_y)]
+
+
+def gen_cave(size_x=9, size_y=9, wall_chance=0.45, iterations=4, birth=(5, 6, 7, 8), survive=(4, 5, 6, 7, 8),
+             random_seed=None, fill_types=[1], empty_types=[0], room_list=None, rng=None):
+    """
+    Generates an organic, cave-like map with a cellular automaton. The map starts as random noise (each cell is a wall
+    with a chance of wall_chance), and is then smoothed by counting each cell's walls among its eight surrounding cells
+    (cells beyond the border count as walls), all at once:
+
+    A wall stays a wall if its count is in survive;
+    An open cell becomes a wall if its count is in birth.
+
+    The defaults (B5678/S45678) give rounded caverns joined by winding passages. Each pass works on the whole grid at
+    once, so even very large maps (i.e. 2048 x 2048) generate quickly with NumPy.
+
+    wall_chance = the chance (from 0 to 1) of each cell starting out as a wall.
+    iterations = how many smoothing passes to make.
+    birth, survive = the wall counts (from 0 to 8) that make open cells become walls, and that let walls stay walls.
+    random_seed = Random seed value; the same seed gives the same map.
+    fill_types = the values to pick from at random for the open (cave) cells.
+    empty_types = the values to pick from at random for the walls.
+    room_list = A previous room list to carve the cave into; its cells that aren't in empty_types are always open (and
+    keep their values), so the cave grows around the rooms that are already there.
+    rng = the random number generator to draw from - a random.Random or a NumPy Generator - instead of a new one seeded with
+    random_seed.
+    """
+
+    rng = _rng_for(random_seed, rng)
+
+    if room_list is None:
+        room = RoomGrid(size_x, size_y, typecode=_typecode_for(fill_types + empty_types))
+        kept = None
+    else:
+        room = _working_copy(room_list, fill_types + empty_types)
+        size_x, size_y = room.size_x, room.size_y
+
+    walls = _random_mask(size_x, size_y, wall_chance, rng)
+
+    rock = RoomGrid(size_x, size_y, typecode=room.typecode)
+    floor = RoomGrid(size_x, size_y, typecode=room.typecode)
+
+    _fill_random(rock, empty_types, rng)
+    _fill_random(floor, fill_types, rng)
+
+    birth_table = [n in birth for n in range(9)]
+    survive_table = [n in survive for n in range(9)]
+
+    if room.array is not None:
+
+        if room_list is not None:
+            kept = ~numpy.isin(room.array, empty_types)
+            walls &= ~kept
+
+        birth_table = numpy.array(birth_table)
+        survive_table = numpy.array(survive_table)
+
+        for i in range(iterations):
+
+            padded = numpy.pad(walls, 1, constant_values=True).view(numpy.uint8)
+
+            counts = (padded[:-2, :-2] + padded[:-2, 1:-1] + padded[:-2, 2:] +
+                      padded[1:-1, :-2] + padded[1:-1, 2:] +
+                      padded[2:, :-2] + padded[2:, 1:-1] + padded[2:, 2:])
+
+            walls = numpy.where(walls, survive_table[counts], birth_table[counts])
+
+            if kept is not None:
+                walls &= ~kept
+
+        new_cells = numpy.where(walls, rock.array, floor.array)
+
+        if kept is None:
+            room.array[...] = new_cells
+        else:
+            room.array[...] = numpy.where(kept, room.array, new_cells)
+
+        return room
+
+    if room_list is not None:
+        kept = [[v not in empty_types for v in room.row(y)] for y in range(size_y)]
+        walls = [[w and not k for w, k in zip(wr, kr)] for wr, kr in zip(walls, kept)]
+
+    solid = [True] * (size_x + 2)
+
+    for i in range(iterations):
+
+        padded = [solid] + [[True] + row + [True] for row in walls] + [solid]
+
+        new_walls = []
+
+        for y in range(size_y):
+
+            a, b, c = padded[y], padded[y + 1], padded[y + 2]
+
+            row = []
+
+            for x in range(size_x):
+
+                n = a[x] + a[x + 1] + a[x + 2] + b[x] + b[x + 2] + c[x] + c[x + 1] + c[x + 2]
+
+                row.append(survive_table[n] if b[x + 1] else birth_table[n])
+
+            if kept is not None:
+                row = [w and not k for w, k in zip(row, kept[y])]
+
+            new_walls.append(row)
+
+        walls = new_walls
+
+    for y in range(size_y):
+
+        out = room.row(y)
+        rock_row, floor_row = rock.row(y), floor.row(y)
+
+        for x, wall in enumerate(walls[y]):
+            if kept is None or not kept[y][x]:
+                out[x] = rock_row[x] if wall else floor_row[x]
+
+    return room
+
+
+# ~~~~ Chunked Generation ~~~~~
+
+_MASK_64 = (1 << 64) - 1
+
+
+def _mix_seed(*values):
+
+    # Hashes the integers in values together into a 64-bit seed (with splitmix64's mixing steps). Unlike hash(), the
+    # result is the same on every run, platform, and Python version.
+
+    h = 0x9E3779B97F4A7C15
+
+    for v in values:
+
+        h = ((h ^ (v & _MASK_64)) + 0x9E3779B97F4A7C15) & _MASK_64
+        h = ((h ^ (h >> 30)) * 0xBF58476D1CE4E5B9) & _MASK_64
+        h = ((h ^ (h >> 27)) * 0x94D049BB133111EB) & _MASK_64
+        h ^= h >> 31
+
+    return h
+
+
+def _filled_cells(grid, empty_types):
+
+    # Returns the (y, x) positions of all of the grid's non-empty cells.
+
+    if grid.array is not None:
+
+        ys, xs = numpy.nonzero(~numpy.isin(grid.array, empty_types))
+
+        return list(zip(ys.tolist(), xs.tolist()))
+
+    return [(y, x) for y, row in enumerate(grid.to_list()) for x, v in enumerate(row) if v not in empty_types]
+
+
+def _carve_door(grid, door_y, door_x, vertical, filled, empty_types, hall_types, rng):
+
+    # Carves a hall from the border cell at door_y, door_x to the closest filled cell (or the middle of the grid if
+    # there aren't any), first along the border's normal (up or down if vertical), then along it.
+
+    if filled:
+        target_y, target_x = min(filled, key=lambda c: abs(c[0] - door_y) + abs(c[1] - door_x))
+    else:
+        target_y, target_x = grid.size_y // 2, grid.size_x // 2
+
+    y, x = door_y, door_x
+
+    while True:
+
+        if grid.get(y, x) in empty_types:
+            grid.set(y, x, rng.choice(hall_types))
+
+        if (y, x) == (target_y, target_x):
+            break
+
+        if vertical and y != target_y or x == target_x:
+            y += 1 if target_y > y else -1
+        else:
+            x += 1 if target_x > x else -1
+
+
+class ChunkedLevel():
+
+    """
+    An endless level, generated a chunk at a time as it's needed. Each chunk is a RoomGrid made by running a
+    generation function with a seed hashed from (world_seed, chunk_x, chunk_y), so any chunk can be made at any time, in
+    any order, without making the chunks around it first - and it always comes out the same.
+
+    Chunks are joined up by hallways across their borders: the spot where each border is crossed is hashed from the
+    border's position, so the chunks on both sides agree on it without seeing each other, and a hall is carved from it
+    to the closest filled cell in each chunk (in its biggest group of connected cells, if there's more than one).
+
+    Only the most recently used chunks are kept (see cache_size); others are dropped and made again if they're needed.
+
+    generator = the generation function to make each chunk with (i.e. gen_nodes, gen_growth)
+    chunk_size = width and height of each chunk, in cells
+    world_seed = seed for the whole level
+    cache_size = how many chunks to keep around at most
+    empty_types = cell values that count as empty when looking for a cell to connect the border halls to
+    hall_types = values to pick from for the border halls
+    clear_borders = if each chunk should be generated two cells smaller and surrounded by a ring of empty cells (of
+    empty_types[0]), so that chunks only meet at the halls
+    generator_args = a dictionary of any other arguments to pass to the generator (i.e. {'nodecount': 6})
+
+    Cells are addressed with world cell co-ordinates (cell_x, cell_y), which can go on forever in both directions
+    (negative, too); cell (0, 0) is the top-left cell of chunk (0, 0).
+    """
+
+    def __init__(self, generator=None, chunk_size=32, world_seed=0, cache_size=64, empty_types=[0], hall_types=[1],
+                 clear_borders=True, generator_args=None):
+
+        self.generator = gen_nodes if generator is None else generator
+        self.chunk_size = chunk_size
+        self.world_seed = world_seed
+        self.cache_size = cache_size
+        self.empty_types = empty_types
+        self.hall_types = hall_types
+        self.clear_borders = clear_borders
+        self.generator_args = {} if generator_args is None else generator_args
+
+        self.chunks = collections.OrderedDict()  # (chunk_x, chunk_y): RoomGrid, from least to most recently used
+
+    def chunk_seed(self, chunk_x, chunk_y):
+        """
+        Returns the seed that the chunk at chunk_x, chunk_y is generated with.
+        """
+
+        return _mix_seed(self.world_seed, chunk_x, chunk_y)
+
+    def chunk_of(self, cell_x, cell_y):
+        """
+        Returns the chunk co-ordinates (chunk_x, chunk_y) of the chunk that holds the world cell at cell_x, cell_y.
+        """
+
+        return cell_x // self.chunk_size, cell_y // self.chunk_size
+
+    def get_chunk(self, chunk_x, chunk_y):
+        """
+        Returns the RoomGrid of the chunk at chunk_x, chunk_y, generating it if it isn't cached.
+        """
+
+        key = (chunk_x, chunk_y)
+
+        if key in self.chunks:
+
+            self.chunks.move_to_end(key)
+
+            return self.chunks[key]
+
+        grid = self.generate_chunk(chunk_x, chunk_y)
+
+        self.chunks[key] = grid
+
+        while len(self.chunks) > self.cache_size:
+            self.chunks.popitem(last=False)  # Drop the least recently used chunk
+
+        return grid
+
+    def generate_chunk(self, chunk_x, chunk_y):
+        """
+        Generates and returns the RoomGrid of the chunk at chunk_x, chunk_y, without touching the cache.
+        """
+
+        size = self.chunk_size
+
+        # With clear_borders, the generator makes a chunk two cells smaller that's then surrounded by empty cells (rather
+        # than emptying the outer ring afterwards, which could cut off cells that were only joined up through it)
+
+        inner = size - 2 if self.clear_borders else size
+
+        grid = self.generator(size_x=inner, size_y=inner, random_seed=self.chunk_seed(chunk_x, chunk_y),
+                              **self.generator_args)
+
+        if grid is None:  # The generator couldn't make anything (i.e. gen_nodes with too few nodes)
+            grid = RoomGrid(inner, inner, self.empty_types[0])
+
+        grid = _working_copy(grid, self.hall_types + self.empty_types[:1])
+
+        if self.clear_borders:
+
+            inner_grid = grid
+
+            grid = RoomGrid(size, size, self.empty_types[0], inner_grid.typecode)
+
+            view = grid.view(1, 1, inner, inner)
+
+            for y in range(inner):
+                view.row(y)[:] = inner_grid.row(y)
+
+        rng = random.Random(_mix_seed(self.world_seed, chunk_x, chunk_y, 1))
+
+        doors = [(self._door(chunk_x, chunk_y, 0), 0),  # Left border; each chunk owns its left and top borders,
+                 (self._door(chunk_x + 1, chunk_y, 0), size - 1),  # so the right one is the next chunk's left one
+                 (0, self._door(chunk_x, chunk_y, 1)),  # Top border
+                 (size - 1, self._door(chunk_x, chunk_y + 1, 1))]  # Bottom border
+
+        filled = _filled_cells(grid, self.empty_types)
+
+        regions = label_regions(grid, self.empty_types)
+
+        if regions['count'] > 1:  # Connect the halls to the biggest group of cells, so they all meet each other
+
+            biggest = regions['sizes'].index(max(regions['sizes'])) + 1
+
+            filled = [(y, x) for y, x in filled if regions['labels'].get(y, x) == biggest]
+
+        for y, x in doors:  # Doors on the top or bottom border head up or down first
+            _carve_door(grid, y, x, y in (0, size - 1), filled, self.empty_types, self.hall_types, rng)
+
+        return grid
+
+    def _door(self, chunk_x, chunk_y, axis):
+
+        # Returns where the left (axis 0) or top (axis 1) border of the chunk at chunk_x, chunk_y is crossed, as a
+        # position along that border (never in a corner).
+
+        return 1 + _mix_seed(self.world_seed, chunk_x, chunk_y, 2 + axis) % (self.chunk_size - 2)
+
+    def get_cell(self, cell_x, cell_y):
+        """
+        Returns the value of the world cell at cell_x, cell_y.
+        """
+
+        chunk_x, chunk_y = self.chunk_of(cell_x, cell_y)
+
+        return self.get_chunk(chunk_x, chunk_y).get(cell_y - chunk_y * self.chunk_size, cell_x - chunk_x * self.chunk_size)
+
+    def chunks_around(self, cell_x, cell_y, radius=1):
+        """
+        Returns a dictionary of the chunks ((chunk_x, chunk_y): RoomGrid) within radius chunks of the one holding the
+        world cell at cell_x, cell_y, generating them as needed. Keep cache_size at least (radius * 2 + 1) ** 2 so that
+        they all stay cached.
+        """
+
+        center_x, center_y = self.chunk_of(cell_x, cell_y)
+
+        return {(chunk_x, chunk_y): self.get_chunk(chunk_x, chunk_y)
+                for chunk_y in range(center_y - radius, center_y + radius + 1)
+                for chunk_x in range(center_x - radius, center_x + radius + 1)}
+
+
+# ~~~~ Region Regeneration ~~~~~
+
+
+def _region_doors(grid, top, left, size_y, size_x, empty_types):
+
+    # Returns where the rectangle's border is met by non-empty cells outside of it, as (y, x, vertical) in the
+    # rectangle's co-ordinates (vertical for the top and bottom borders). Each run of such cells along a border counts
+    # as a single door, in the middle of the run.
+
+    sides = []
+
+    if top > 0:
+        sides.append([(0, x, True, grid.get(top - 1, left + x)) for x in range(size_x)])
+    if top + size_y < grid.size_y:
+        sides.append([(size_y - 1, x, True, grid.get(top + size_y, left + x)) for x in range(size_x)])
+    if left > 0:
+        sides.append([(y, 0, False, grid.get(top + y, left - 1)) for y in range(size_y)])
+    if left + size_x < grid.size_x:
+        sides.append([(y, size_x - 1, False, grid.get(top + y, left + size_x)) for y in range(size_y)])
+
+    doors = []
+
+    for side in sides:
+
+        run = []
+
+        for y, x, vertical, outside in side + [(None, None, None, empty_types[0])]:
+
+            if outside not in empty_types:
+                run.append((y, x, vertical))
+            elif run:
+                doors.append(run[len(run) // 2])
+                run = []
+
+    return doors
+
+
+def regenerate_region(room_list, top, left, size_y, size_x, generator=None, random_seed=None, empty_types=[0],
+                      hall_types=[1], connect=True, generator_args=None):
+    """
+    Generates a rectangular region of an existing room list again, in place, leaving the rest of it alone (i.e. to
+    re-roll one wing of a level while the game's running). Only the region is generated and written, so the time this
+    takes depends on the region's size, not the level's.
+
+    room_list = the RoomGrid (or list of lists) to change; the new cells have to fit into a RoomGrid's storage type
+    top, left = the row and column of the region's top-left cell
+    size_y, size_x = how tall and wide the region is (it's clipped to the room list)
+    generator = the generation function to fill the region with (i.e. gen_nodes, gen_growth, gen_cave); it's called
+    with size_x, size_y, and random_seed, plus generator_args
+    random_seed = Random seed value; the same seed gives the same region
+    empty_types = cell values that count as empty
+    hall_types = values to pick from for the connecting halls
+    connect = if the region should stay connected to the level around it; wherever non-empty cells outside the region
+    meet its border, a hall is carved from that spot on the border to the closest non-empty cell inside the region (in
+    its biggest group of connected cells, if there's more than one)
+    generator_args = a dictionary of any other arguments to pass to the generator (i.e. {'nodecount': 4})
+
+    Returns the room list passed in.
+    """
+
+    if isinstance(room_list, RoomGrid):
+        level_y, level_x = room_list.size_y, room_list.size_x
+    else:
+        level_y, level_x = len(room_list), len(room_list[0]) if room_list else 0
+
+    bottom, right = min(top + size_y, level_y), min(left + size_x, level_x)
+    top, left = max(top, 0), max(left, 0)
+    size_y, size_x = bottom - top, right - left
+
+    if size_y <= 0 or size_x <= 0:
+        return room_list
+
+    # Only the region and the ring of cells around it are looked at; for a list of lists, just those cells are copied
+    # into a RoomGrid (rather than the whole level), and a RoomGrid is worked on through a view
+
+    ring_top, ring_left = max(top - 1, 0), max(left - 1, 0)
+    ring_bottom, ring_right = min(bottom + 1, level_y), min(right + 1, level_x)
+
+    if isinstance(room_list, RoomGrid):
+        grid = room_list.view(ring_top, ring_left, ring_bottom - ring_top, ring_right - ring_left)
+    else:
+        grid = RoomGrid.from_list([row[ring_left:ring_right] for row in room_list[ring_top:ring_bottom]])
+
+    generator = gen_nodes if generator is None else generator
+
+    region = generator(size_x=size_x, size_y=size_y, random_seed=random_seed,
+                       **({} if generator_args is None else generator_args))
+
+    if region is None:  # The generator couldn't make anything (i.e. gen_nodes with too few nodes)
+        region = RoomGrid(size_x, size_y, empty_types[0])
+
+    region = _working_copy(region, hall_types)
+
+    if connect:
+
+        rng = _rng_for(random_seed, None)
+
+        filled = _filled_cells(region, empty_types)
+
+        regions = label_regions(region, empty_types)
+
+        if regions['count'] > 1:  # Connect the halls to the biggest group of cells, rather than a stray pocket
+
+            biggest = regions['sizes'].index(max(regions['sizes'])) + 1
+
+            filled = [(y, x) for y, x in filled if regions['labels'].get(y, x) == biggest]
+
+        for y, x, vertical in _region_doors(grid, top - ring_top, left - ring_left, size_y, size_x, empty_types):
+            _carve_door(region, y, x, vertical, filled, empty_types, hall_types, rng)
+
+    cells = region.to_list()
+
+    if not isinstance(room_list, RoomGrid):  # A list of lists; copy the region back into it
+
+        for y, row in enumerate(cells):
+            room_list[top + y][left:right] = row
+
+        return room_list
+
+    if region.typecode != grid.typecode:
+
+        low, high = _RG_RANGES[grid.typecode]
+
+        if min(min(row) for row in cells) < low or max(max(row) for row in cells) > high:
+            raise ValueError("The regenerated cells don't fit into the room list's storage type.")
+
+    view = room_list.view(top, left, size_y, size_x)
+
+    if view.array is not None:
+        view.array[...] = region.array
+    else:
+        for y, row in enumerate(cells):
+            view.row(y)[:] = array.array(view.typecode, row)
+
+    return room_list
+
+
+# ~~~~ Batch Generation ~~~~~
+
+
+def _walkable_cells(grid, empty_types, walkable_types=None):
+
+    # Returns a flat list (y * size_x + x) of whether each of the RoomGrid's cells is walkable - in walkable_types if
+    # that's given, or not in empty_types otherwise.
+
+    if grid.array is not None:
+
+        if walkable_types is not None:
+            return numpy.isin(grid.array, walkable_types).ravel().tolist()
+
+        return (~numpy.isin(grid.array, empty_types)).ravel().tolist()
+
+    if walkable_types is not None:
+        return [v in walkable_types for row in grid.to_list() for v in row]
+
+    return [v not in empty_types for row in grid.to_list() for v in row]
+
+
+def _walkable_runs(grid, empty_types, walkable_types=None):
+
+    # Returns the horizontal runs of walkable cells in the RoomGrid, in row-major order, as three lists: the row of each
+    # run, its first column, and the column after its last one.
+
+    if grid.array is not None:
+
+        if walkable_types is not None:
+            w = numpy.isin(grid.array, walkable_types)
+        else:
+            w = ~numpy.isin(grid.array, empty_types)
+
+        padded = numpy.zeros((grid.size_y, grid.size_x + 2), dtype=numpy.int8)
+        padded[:, 1:-1] = w
+
+        edges = numpy.diff(padded, axis=1)
+
+        rows, starts = numpy.nonzero(edges == 1)
+        ends = numpy.nonzero(edges == -1)[1]
+
+        return rows.tolist(), starts.tolist(), ends.tolist()
+
+    walkable = _walkable_cells(grid, empty_types, walkable_types)
+
+    size_x = grid.size_x
+
+    rows, starts, ends = [], [], []
+
+    for y in range(grid.size_y):
+
+        row = walkable[y * size_x:(y + 1) * size_x]
+
+        x = 0
+
+        while x < size_x:
+
+            if row[x]:
+
+                start = x
+
+                while x < size_x and row[x]:
+                    x += 1
+
+                rows.append(y)
+                starts.append(start)
+                ends.append(x)
+
+            x += 1
+
+    return rows, starts, ends
+
+
+def label_regions(room_list, empty_types=[0], walkable_types=None):
+    """
+    Labels the separate groups of connected walkable cells in the room grid (cells connect to their left, right, up,
+    and down neighbors). This works on runs of cells rather than single cells - the runs on each row are found in one
+    go, and joined up with the runs they touch on the row above with a union-find - so it takes time in line with the
+    size of the grid.
+
+    room_list = Room array (RoomGrid or list of lists)
+    empty_types = the cell values that can't be walked on
+    walkable_types = if given, only these cell values can be walked on (and empty_types is ignored)
+
+    Returns a dictionary consisting of these keys:
+
+    "labels" = a RoomGrid (RG_TYPE_INT32) of which group each cell is in, numbered from 1 in the order the groups are
+    first reached going row by row from the top-left; unwalkable cells are 0
+    "count" = how many groups there are (1 means the level's fully connected)
+    "sizes" = a list of how many cells each group has; group n's size is sizes[n - 1]
+    """
+
+    grid = as_grid(room_list)
+
+    size_x, size_y = grid.size_x, grid.size_y
+
+    rows, starts, ends = _walkable_runs(grid, empty_types, walkable_types)
+
+    parent = list(range(len(rows)))
+
+    def find(i):
+
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+
+        return i
+
+    # Join each run with the runs it overlaps on the row above, walking both rows' runs side by side
+
+    above_first = above_last = 0  # The runs on the row above (none, to start with)
+    j = 0
+
+    for i in range(len(rows)):
+
+        if i == 0 or rows[i] != rows[i - 1]:  # First run of a row
+
+            if i > 0 and rows[i - 1] == rows[i] - 1:
+                above_first, above_last = row_first, i
+            else:
+                above_first = above_last = i
+
+            row_first = i
+            j = above_first
+
+        while j < above_last and ends[j] <= starts[i]:  # Runs above that end before this one can't touch it (or the
+            j += 1  # ones after it on this row)
+
+        k = j
+
+        while k < above_last and starts[k] < ends[i]:
+
+            a, b = find(i), find(k)
+
+            if a != b:
+                parent[max(a, b)] = min(a, b)  # The root's always the group's first run
+
+            k += 1
+
+    run_labels = []
+    root_labels = {}
+    sizes = []
+
+    for i in range(len(rows)):
+
+        root = find(i)
+
+        if root not in root_labels:
+            root_labels[root] = len(root_labels) + 1
+            sizes.append(0)
+
+        label = root_labels[root]
+
+        run_labels.append(label)
+        sizes[label - 1] += ends[i] - starts[i]
+
+    labels = RoomGrid(size_x, size_y, 0, RG_TYPE_INT32)
+
+    if labels.array is not None:
+
+        if rows:
+
+            lengths = numpy.array(ends) - numpy.array(starts)
+            firsts = numpy.array(rows) * size_x + numpy.array(starts)
+
+            # The flat index of every cell of every run, all at once
+
+            offsets = numpy.repeat(firsts - (numpy.cumsum(lengths) - lengths), lengths)
+            cells = offsets + numpy.arange(int(lengths.sum()))
+
+            labels.array.ravel()[cells] = numpy.repeat(numpy.array(run_labels, dtype=numpy.int32), lengths)
+
+    else:
+
+        for y, start, end, label in zip(rows, starts, ends, run_labels):
+            labels.row(y)[start:end] = array.array(RG_TYPE_INT32, [label] * (end - start))
+
+    return {'labels': labels, 'count': len(sizes), 'sizes': sizes}
+
+
+def distance_map(room_list, sources, empty_types=[0], walkable_types=None):
+    """
+    Works out how many steps away each walkable cell is from the closest of the source cells (moving left, right, up,
+    and down through walkable cells), with a single breadth-first search from all of the sources at once, so it takes
+    time in line with the size of the grid. Useful for picking a spawn point far away from the exit, for example.
+
+    room_list = Room array (RoomGrid or list of lists)
+    sources = a list of (y, x) cells to measure from; unwalkable ones are skipped
+    empty_types = the cell values that can't be walked on
+    walkable_types = if given, only these cell values can be walked on (and empty_types is ignored)
+
+    Returns a dictionary consisting of these keys:
+
+    "distances" = a RoomGrid (RG_TYPE_INT32) of each cell's distance; cells that can't be reached are -1
+    "furthest" = one of the cells furthest away from the sources, as (y, x), or None if none of the sources are walkable
+    "max" = how far away that cell is (-1 if there isn't one)
+    """
+
+    grid = as_grid(room_list)
+
+    size_x, size_y = grid.size_x, grid.size_y
+
+    walkable = _walkable_cells(grid, empty_types, walkable_types)
+
+    dist, last = _bfs(walkable, size_x, size_y, [y * size_x + x for y, x in sources
+                                                 if 0 <= y < size_y and 0 <= x < size_x])
+
+    if numpy is not None:
+        distances = RoomGrid._wrap(RG_TYPE_INT32, numpy.array(dist, dtype=numpy.int32).reshape((size_y, size_x)))
+    else:
+        distances = RoomGrid._wrap(RG_TYPE_INT32, buffer=array.array(RG_TYPE_INT32, dist), stride=size_x, size_x=size_x,
+                                   size_y=size_y)
+
+    if last is None:
+        return {'distances': distances, 'furthest': None, 'max': -1}
+
+    return {'distances': distances, 'furthest': divmod(last, size_x), 'max': dist[last]}
+
+
+def _bfs(walkable, size_x, size_y, sources):
+
+    # Breadth-first searches the walkable cells (a flat list of bools) out from the sources (flat indices), and returns
+    # a flat list of how many steps away each cell is (-1 for cells that can't be reached), along with the last cell
+    # reached (one of the furthest ones).
+
+    dist = [-1] * (size_x * size_y)
+
+    queue = []
+
+    for i in sources:
+        if walkable[i] and dist[i] < 0:
+            dist[i] = 0
+            queue.append(i)
+
+    last = queue[-1] if queue else None
+
+    for i in queue:  # The queue grows as it's gone through
+
+        d = dist[i] + 1
+        x = i % size_x
+
+        for n, ok in ((i - 1, x > 0), (i + 1, x < size_x - 1), (i - size_x, i >= size_x), (i + size_x, i < len(dist) - size_x)):
+
+            if ok and walkable[n] and dist[n] < 0:
+                dist[n] = d
+                queue.append(n)
+                last = n
+
+    return dist, last
+
+
+def measure_level(room_list, empty_types=[0]):
+    """
+    Measures the layout of a room grid, treating every cell that isn't in empty_types as walkable. Returns a dictionary
+    consisting of these keys:
+
+    "cells" = how many walkable cells there are
+    "components" = how many separate groups of walkable cells there are (1 means the level's fully connected)
+    "largest" = how many cells the biggest of those groups has
+    "dead_ends" = how many walkable cells have exactly one walkable neighbor
+    "diameter" = how many steps apart the two furthest-apart cells of the biggest group are; found with two
+    breadth-first searches (from any cell to the furthest one from it, then from there to the furthest one from that),
+    so it's exact for tree-like levels and a close lower bound for levels with loops
+
+    This all takes time in line with the size of the grid.
+    """
+
+    grid = as_grid(room_list)
+
+    size_x, size_y = grid.size_x, grid.size_y
+
+    walkable = _walkable_cells(grid, empty_types)
+
+    if grid.array is not None:
+
+        w = numpy.array(walkable, dtype=numpy.int8).reshape((size_y, size_x))
+
+        neighbors = numpy.zeros_like(w)
+        neighbors[:, 1:] += w[:, :-1]
+        neighbors[:, :-1] += w[:, 1:]
+        neighbors[1:] += w[:-1]
+        neighbors[:-1] += w[1:]
+
+        dead_ends = int(numpy.count_nonzero((neighbors == 1) & (w == 1)))
+
+    else:
+
+        dead_ends = 0
+
+        for i, ok in enumerate(walkable):
+
+            if ok:
+
+                x = i % size_x
+
+                n = ((x > 0 and walkable[i - 1]) + (x < size_x - 1 and walkable[i + 1]) +
+                     (i >= size_x and walkable[i - size_x]) + (i < len(walkable) - size_x and walkable[i + size_x]))
+
+                dead_ends += n == 1
+
+    regions = label_regions(grid, empty_types)
+
+    sizes = regions['sizes']
+
+    largest = max(sizes) if sizes else 0
+    diameter = 0
+
+    if sizes:
+
+        label = sizes.index(largest) + 1  # The first of the biggest groups
+
+        if grid.array is not None:
+            start = int(numpy.argmax(regions['labels'].array.ravel() == label))
+        else:
+            start = next(y * size_x + row.index(label) for y, row in enumerate(regions['labels'].to_list()) if label in row)
+
+        dist, last = _bfs(walkable, size_x, size_y, [start])
+        dist, last = _bfs(walkable, size_x, size_y, [last])
+
+        diameter = dist[last]
+
+    return {'cells': sum(walkable), 'components': regions['count'], 'largest': largest, 'dead_ends': dead_ends,
+            'diameter': diameter}
+
+
+def _batch_job(generator, args, seed, empty_types):
+
+    # Runs one job of generate_batch(); this runs in the worker processes, so only the (compact) grid and the metrics
+    # get sent back.
+
+    grid = generator(random_seed=seed, **args)
+
+    metrics = None if grid is None else measure_level(grid, empty_types)
+
+    return grid, metrics
+
+
+def generate_batch(jobs, generator=None, max_workers=None, empty_types=[0], score=None, keep=None, executor=None):
+    """
+    Generates and measures a batch of levels at once, spread over a pool of worker processes; useful for generating
+    lots of candidate levels and keeping the best ones.
+
+    jobs = a list of (arguments, seed) pairs, one per level - arguments is a dictionary of arguments for the generator
+    (i.e. {'size_x': 64, 'size_y': 64, 'nodecount': 12}), and seed is passed to it as random_seed
+    generator = the generation function to use (gen_nodes by default); it has to be a module-level function, so that
+    the workers can find it
+    max_workers = how many worker processes to use (defaults to the number of CPUs); 0 runs every job right here
+    instead, one after the other
+    empty_types = values that don't count as walkable when measuring the levels (see measure_level())
+    score = an optional function that takes a result (see below) and returns a number; the results are sorted from
+    highest score to lowest
+    keep = if set, only this many results are returned (the best ones, if score is set)
+    executor = an optional concurrent.futures executor to use instead of making a new process pool
+
+    Each level is generated and measured (see measure_level()) in a worker, so only the finished grid and its metrics
+    are sent back. Returns a list of dictionaries (in the order of the jobs, unless score is set), consisting of:
+
+    "args" and "seed" = the job's arguments and seed
+    "grid" = the generated RoomGrid (or None if the generator failed)
+    "metrics" = the dictionary returned by measure_level() for the grid (or None)
+
+    Note that worker processes need to be able to import this module; on platforms where new processes are started
+    fresh rather than forked from the game (like Windows), that might not be possible from inside the game engine -
+    use max_workers=0 (or a thread pool for executor) there.
+    """
+
+    if generator is None:
+        generator = gen_nodes
+
+    jobs = list(jobs)
+
+    if max_workers == 0 and executor is None:
+
+        finished = [_batch_job(generator, args, seed, empty_types) for args, seed in jobs]
+
+    else:
+
+        pool = executor if executor is not None else concurrent.futures.ProcessPoolExecutor(max_workers)
+
+        try:
+            futures = [pool.submit(_batch_job, generator, args, seed, empty_types) for args, seed in jobs]
+            finished = [f.result() for f in futures]
+        finally:
+            if executor is None:
+                pool.shutdown()
+
+    results = [{'args': args, 'seed': seed, 'grid': grid, 'metrics': metrics}
+               for (args, seed), (grid, metrics) in zip(jobs, finished)]
+
+    if score is not None:
+        results.sort(key=score, reverse=True)
+
+    if keep is not None:
+        results = results[:keep]
+
+    return results
+
+
+# ~~~~ Level Caching ~~~~~
+
+
+def _stable_repr(value):
+
+    # Returns a string representing value that's the same from run to run (dictionaries are sorted by key).
+
+    if isinstance(value, dict):
+        return '{' + ', '.join(_stable_repr(k) + ': ' + _stable_repr(value[k]) for k in sorted(value, key=repr)) + '}'
+
+    if isinstance(value, (list, tuple)):
+        text = ', '.join(_stable_repr(v) for v in value)
+
+        return '[' + text + ']' if isinstance(value, list) else '(' + text + ')'
+
+    if callable(value):
+        return getattr(value, '__module__', '') + '.' + getattr(value, '__qualname__', repr(value))
+
+    return repr(value)
+
+
+class LevelCache():
+
+    """
+    A cache of generated levels on disk, so that the same level (the same generation function, arguments, and seed)
+    doesn't need to be generated again on every launch or restart. Each level is stored in its own file, named after a
+    hash of the generation function's name, its arguments, and RLG_VERSION, and loaded by memory-mapping it (with
+    NumPy, the RoomGrid then reads the file's memory directly).
+
+    The files are a 16-byte header (b'RLGC', a format version byte, the typecode, two padding bytes, and the width and
+    height as little-endian 32-bit ints) followed by the cells, as RoomGrid.tobytes() returns them.
+
+    directory = the folder to keep the cached levels in (created if needed)
+    max_size = how many bytes the cached levels can take up at most; when there's more, the least recently used levels
+    are deleted
+    """
+
+    HEADER = struct.Struct('<4sBcxxII')
+    MAGIC = b'RLGC'
+    FORMAT_VERSION = 1
+
+    def __init__(self, directory, max_size=64 * 1024 * 1024):
+
+        self.directory = directory
+        self.max_size = max_size
+
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, generator, args):
+        """
+        Returns the cache key (a hex string) for the level made by calling generator with the dictionary of args.
+        """
+
+        text = _stable_repr((generator, args, RLG_VERSION))
+
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+    def path(self, key):
+
+        return os.path.join(self.directory, key + '.rlg')
+
+    def load(self, key):
+        """
+        Returns the cached RoomGrid for key, or None if it isn't cached. The grid is copy-on-write, so changing it
+        doesn't change the cached level.
+        """
+
+        path = self.path(key)
+
+        try:
+
+            with open(path, 'rb') as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+
+        except (OSError, ValueError):  # Missing (or empty, which can't be mapped)
+
+            return None
+
+        if len(mapped) < self.HEADER.size:
+            return None
+
+        magic, version, typecode, size_x, size_y = self.HEADER.unpack_from(mapped)
+        typecode = typecode.decode('ascii')
+
+        if magic != self.MAGIC or version != self.FORMAT_VERSION or typecode not in _RG_RANGES:
+            return None
+
+        if len(mapped) < self.HEADER.size + size_x * size_y * _RG_SIZES[typecode]:
+            return None
+
+        os.utime(path)  # Mark it as recently used
+
+        return RoomGrid.frombuffer(mapped, size_x, size_y, typecode, self.HEADER.size)
+
+    def store(self, key, grid):
+        """
+        Stores the RoomGrid in the cache under key, and then trims the cache down to max_size.
+        """
+
+        grid = as_grid(grid)
+
+        path = self.path(key)
+        temp = path + '.tmp'
+
+        with open(temp, 'wb') as f:
+            f.write(self.HEADER.pack(self.MAGIC, self.FORMAT_VERSION, grid.typecode.encode('ascii'), grid.size_x,
+                                     grid.size_y))
+            f.write(grid.tobytes())
+
+        os.replace(temp, path)  # So that a half-written file is never loaded
+
+        self.trim()
+
+    def trim(self):
+        """
+        Deletes the least recently used levels until the cache fits into max_size.
+        """
+
+        entries = []
+
+        for name in os.listdir(self.directory):
+
+            if name.endswith('.rlg'):
+
+                try:
+                    stat = os.stat(os.path.join(self.directory, name))
+                except OSError:
+                    continue
+
+                entries.append((stat.st_mtime, stat.st_size, name))
+
+        total = sum(e[1] for e in entries)
+
+        for mtime, size, name in sorted(entries):
+
+            if total <= self.max_size:
+                break
+
+            try:
+                os.remove(os.path.join(self.directory, name))
+                total -= size
+            except OSError:  # Still mapped somewhere, maybe; leave it for next time
+                pass
+
+    def generate(self, generator, **args):
+        """
+        Returns the level made by calling generator with args (i.e. cache.generate(gen_nodes, size_x=64, random_seed=3)),
+        loading it from the cache if it's there, and generating and storing it if it isn't. Calls without a random_seed
+        (or passing an rng) make a different level each time, so they aren't cached, and are always generated.
+        """
+
+        if args.get('random_seed') is None or args.get('rng') is not None:
+            return generator(**args)
+
+        key = self.key(generator, args)
+
+        grid = self.load(key)
+
+        if grid is None:
+
+            grid = generator(**args)
+
+            if grid is not None:
+                self.store(key, grid)
+
+        return grid
+
+
+# ~~~~ Serialization ~~~~~
+
+# Ways of encoding the cells of a serialized RoomGrid (see dump_grid())
+
+RG_ENCODING_RAW = 0  # The cells as they're stored in memory; loads without copying
+RG_ENCODING_BITS = 1  # Palette indices packed into 1, 2, 4, or 8 bits per cell
+RG_ENCODING_RLE = 2  # Runs of the same cell, as palette indices and run lengths
+
+# Magic, version, encoding, typecode, flags, width, height, palette length, and data length
+
+_GRID_HEADER = struct.Struct('<4sBBcBIIIQ')
+_GRID_MAGIC = b'RLGS'
+_GRID_VERSION = 1
+_GRID_COMPRESSED = 1  # Flag for zlib-compressed data
+
+
+def _little(typecode, values):
+
+    # Returns an array.array of values (copied if needed) in little-endian byte order.
+
+    a = array.array(typecode, values)
+
+    if sys.byteorder == 'big':
+        a.byteswap()
+
+    return a
+
+
+def _from_little(typecode, data):
+
+    # The reverse of _little(); returns an array.array read from little-endian bytes.
+
+    a = array.array(typecode)
+    a.frombytes(data)
+
+    if sys.byteorder == 'big':
+        a.byteswap()
+
+    return a
+
+
+def _flat_cells(grid):
+
+    # Returns the grid's cells as a flat ndarray with NumPy, or a flat list without.
+
+    if grid.array is not None:
+        return grid.array.ravel()
+
+    return [v for y in range(grid.size_y) for v in grid.row(y)]
+
+
+def _encode_cells(grid, encoding, palette):
+
+    # Returns the grid's cells bit-packed or run-length encoded as bytes (palette is the list of values that the
+    # indices refer to).
+
+    cells = _flat_cells(grid)
+    count = grid.size_x * grid.size_y
+
+    if grid.array is not None:
+
+        lookup = numpy.asarray(palette)
+        order = numpy.argsort(lookup)
+
+        indices = order[numpy.searchsorted(lookup, cells, sorter=order).clip(0, len(palette) - 1)]
+
+        if not numpy.array_equal(lookup[indices], cells):
+            raise ValueError('The palette is missing some of the room grid\'s values.')
+
+        if encoding == RG_ENCODING_BITS:
+
+            bits = _palette_bits(len(palette))
+            per_byte = 8 // bits
+
+            padded = numpy.zeros(-(-count // per_byte) * per_byte, dtype=numpy.uint8)
+            padded[:count] = indices
+
+            shifts = numpy.arange(per_byte, dtype=numpy.uint8) * bits
+
+            return (padded.reshape((-1, per_byte)) << shifts).sum(axis=1, dtype=numpy.uint8).tobytes()
+
+        starts = numpy.flatnonzero(numpy.diff(indices)) + 1
+        starts = numpy.concatenate(([0], starts)) if count else starts
+
+        lengths = numpy.diff(numpy.append(starts, count)).astype('<u4')
+
+        return indices[starts].astype(_index_dtype(len(palette))).tobytes() + lengths.tobytes()
+
+    position = {v: i for i, v in enumerate(palette)}
+
+    try:
+        indices = [position[v] for v in cells]
+    except KeyError:
+        raise ValueError('The palette is missing some of the room grid\'s values.')
+
+    if encoding == RG_ENCODING_BITS:
+
+        bits = _palette_bits(len(palette))
+        per_byte = 8 // bits
+
+        packed = bytearray(-(-count // per_byte))
+
+        for i, index in enumerate(indices):
+            packed[i // per_byte] |= index << (i % per_byte * bits)
+
+        return bytes(packed)
+
+    values = []
+    lengths = []
+
+    for index in indices:
+
+        if values and values[-1] == index:
+            lengths[-1] += 1
+        else:
+            values.append(index)
+            lengths.append(1)
+
+    return _little(_index_typecode(len(palette)), values).tobytes() + _little('I', lengths).tobytes()
+
+
+def _palette_bits(size):
+
+    # Returns how many bits (1, 2, 4, or 8) are needed per palette index.
+
+    for bits in (1, 2, 4, 8):
+        if size <= 1 << bits:
+            return bits
+
+    raise ValueError('Bit-packing needs a palette of 256 values or fewer.')
+
+
+def _index_typecode(size):
+
+    # Returns the array typecode to store run-length palette indices with.
+
+    return 'B' if size <= 256 else 'H' if size <= 65536 else 'I'
+
+
+def _index_dtype(size):
+
+    return {'B': '<u1', 'H': '<u2', 'I': '<u4'}[_index_typecode(size)]
+
+
+def _decode_cells(data, encoding, typecode, size_x, size_y, palette):
+
+    # Returns a RoomGrid decoded from bit-packed or run-length data (any bytes-like object).
+
+    count = size_x * size_y
+
+    if numpy is not None:
+
+        lookup = numpy.asarray(palette, dtype=_RG_DTYPES[typecode])
+
+        if encoding == RG_ENCODING_BITS:
+
+            bits = _palette_bits(len(palette))
+            per_byte = 8 // bits
+
+            packed = numpy.frombuffer(data, dtype=numpy.uint8)
+            shifts = numpy.arange(per_byte, dtype=numpy.uint8) * bits
+
+            indices = ((packed[:, None] >> shifts) & ((1 << bits) - 1)).ravel()[:count]
+
+        else:
+
+            width = numpy.dtype(_index_dtype(len(palette))).itemsize
+            runs = len(data) // (width + 4)
+
+            values = numpy.frombuffer(data, dtype=_index_dtype(len(palette)), count=runs)
+            lengths = numpy.frombuffer(data, dtype='<u4', count=runs, offset=runs * width)
+
+            indices = numpy.repeat(values, lengths)
+
+        return RoomGrid._wrap(typecode, lookup[indices].reshape((size_y, size_x)))
+
+    if encoding == RG_ENCODING_BITS:
+
+        bits = _palette_bits(len(palette))
+        per_byte = 8 // bits
+        mask = (1 << bits) - 1
+
+        data = bytes(data)
+
+        cells = [palette[data[i // per_byte] >> (i % per_byte * bits) & mask] for i in range(count)]
+
+    else:
+
+        index_typecode = _index_typecode(len(palette))
+        width = array.array(index_typecode).itemsize
+        runs = len(data) // (width + 4)
+
+        values = _from_little(index_typecode, bytes(data[:runs * width]))
+        lengths = _from_little('I', bytes(data[runs * width:runs * (width + 4)]))
+
+        cells = []
+
+        for index, length in zip(values, lengths):
+            cells.extend([palette[index]] * length)
+
+    return RoomGrid._wrap(typecode, buffer=array.array(typecode, cells), stride=size_x, size_x=size_x, size_y=size_y)
+
+
+def _pick_encoding(grid, palette):
+
+    # Returns whichever encoding makes the grid's data smallest.
+
+    count = grid.size_x * grid.size_y
+    cells = _flat_cells(grid)
+
+    if grid.array is not None:
+        runs = int(numpy.count_nonzero(cells[1:] != cells[:-1])) + 1 if count else 0
+    else:
+        runs = sum(1 for a, b in zip(cells, cells[1:]) if a != b) + 1 if count else 0
+
+    sizes = {RG_ENCODING_RAW: count * _RG_SIZES[grid.typecode],
+             RG_ENCODING_RLE: runs * (array.array(_index_typecode(len(palette))).itemsize + 4) + len(palette) * 4}
+
+    if len(palette) <= 256:
+        sizes[RG_ENCODING_BITS] = -(-count * _palette_bits(len(palette)) // 8) + len(palette) * 4
+
+    return min(sorted(sizes), key=lambda e: sizes[e])
+
+
+def dump_grid(grid, file, encoding=None, palette=None, compress=False):
+    """
+    Writes the room grid to a file-like object opened for binary writing (i.e. a file, or an io.BytesIO for sending
+    over the network) in a compact binary format: a versioned header with the grid's size and storage type, the
+    palette, and then the cells.
+
+    grid = Room array (RoomGrid or list of lists)
+    file = the file-like object to write to
+    encoding = one of the RG_ENCODING_xxx constants, or None to pick whichever makes the data smallest: the raw cells,
+    the cells' palette indices packed into as few bits as possible (for grids with up to 256 different values), or
+    runs of the same cell (for grids with large areas of the same value)
+    palette = the list of the values that the encoded palette indices refer to; defaults to the grid's distinct values,
+    in order. Passing a fixed palette keeps the indices the same from grid to grid.
+    compress = if the encoded cells should also be compressed with zlib (they then can't be loaded without copying)
+    """
+
+    grid = as_grid(grid)
+
+    if palette is None:
+
+        if grid.array is not None:
+            palette = numpy.unique(grid.array).tolist()
+        else:
+            palette = sorted(set(_flat_cells(grid)))
+
+    if encoding is None:
+        encoding = _pick_encoding(grid, palette)
+
+    if encoding == RG_ENCODING_RAW:
+        palette = []
+        data = grid.tobytes()
+    else:
+        data = _encode_cells(grid, encoding, palette)
+
+    if compress:
+        data = zlib.compress(data)
+
+    file.write(_GRID_HEADER.pack(_GRID_MAGIC, _GRID_VERSION, encoding, grid.typecode.encode('ascii'),
+                                 _GRID_COMPRESSED if compress else 0, grid.size_x, grid.size_y, len(palette), len(data)))
+    file.write(_little('i', palette).tobytes())
+    file.write(data)
+
+
+def dumps_grid(grid, encoding=None, palette=None, compress=False):
+    """
+    Returns the room grid as bytes, serialized like dump_grid() writes it.
+    """
+
+    out = io.BytesIO()
+
+    dump_grid(grid, out, encoding, palette, compress)
+
+    return out.getvalue()
+
+
+def _read_grid(header, palette_bytes, data, palette):
+
+    magic, version, encoding, typecode, flags, size_x, size_y, palette_length, data_length = header
+
+    typecode = typecode.decode('ascii')
+
+    if magic != _GRID_MAGIC or typecode not in _RG_RANGES:
+        raise ValueError("This isn't a serialized room grid.")
+
+    if version > _GRID_VERSION:
+        raise ValueError('This room grid was saved by a newer version (' + str(version) + ').')
+
+    stored = _from_little('i', bytes(palette_bytes)).tolist()
+
+    if palette is None:
+        palette = stored
+    elif len(palette) < len(stored):
+        raise ValueError('The palette is shorter than the one the room grid was saved with.')
+
+    if flags & _GRID_COMPRESSED:
+        data = zlib.decompress(data)
+
+    if encoding == RG_ENCODING_RAW:
+
+        grid = RoomGrid.frombuffer(data, size_x, size_y, typecode)
+
+        if palette is stored:
+            return grid
+
+        # Raw cells aren't stored as palette indices, so the values themselves are looked up in the palette
+
+        typecode = max(typecode, _typecode_for(palette), key=_RG_TYPES.index)
+
+        if grid.array is not None:
+            return RoomGrid._wrap(typecode, numpy.asarray(palette, dtype=_RG_DTYPES[typecode])[grid.array])
+
+        return RoomGrid.from_list([[palette[v] for v in grid.row(y)] for y in range(size_y)], typecode)
+
+    if palette is not stored:
+        typecode = max(typecode, _typecode_for(palette), key=_RG_TYPES.index)
+
+    return _decode_cells(data, encoding, typecode, size_x, size_y, palette)
+
+
+def load_grid(file, palette=None):
+    """
+    Reads a room grid written by dump_grid() from a file-like object opened for binary reading, and returns it as a
+    RoomGrid; only as much of the file as the grid takes up is read, so several grids (or other data) can be stored one
+    after another. Raw (uncompressed) cells are read into a buffer that the RoomGrid then uses directly with NumPy.
+
+    palette = a list of the values to use for the stored palette indices instead of the saved palette (i.e. to load a
+    level with a different set of tiles); for raw cells, each value v is replaced with palette[v]
+    """
+
+    header = file.read(_GRID_HEADER.size)
+
+    if len(header) < _GRID_HEADER.size:
+        raise ValueError("This isn't a serialized room grid.")
+
+    header = _GRID_HEADER.unpack(header)
+
+    palette_bytes = file.read(header[7] * 4)
+
+    data = bytearray(header[8])
+
+    if file.readinto(data) != len(data):
+        raise ValueError('The serialized room grid is cut off.')
+
+    return _read_grid(header, palette_bytes, data, palette)
+
+
+def loads_grid(data, palette=None):
+    """
+    Returns a room grid serialized by dump_grid() or dumps_grid() from a bytes-like object (i.e. bytes, a bytearray, or
+    an mmap). With NumPy, raw (uncompressed) cells are loaded without copying them, so the RoomGrid uses data's memory
+    directly (and is read-only if data is).
+
+    palette = see load_grid()
+    """
+
+    view = memoryview(data)
+
+    if len(view) < _GRID_HEADER.size:
+        raise ValueError("This isn't a serialized room grid.")
+
+    header = _GRID_HEADER.unpack_from(view)
+
+    start = _GRID_HEADER.size + header[7] * 4
+
+    return _read_grid(header, view[_GRID_HEADER.size:start], view[start:start + header[8]], palette)
+
+
+##### Map population functions #####
+
+def invert(room_list, inversion_dict):
+    """
+
+    Inverts the room_list provided. Provide a list of what values to invert, and what the inverted value should be.
+    For example, for inversion_dict:
+
+    {0:1, 3:4, ...}
+
+    So that if you provide a list such as:
+
+    [[0,0,0,0,1,1]
+    [0,0,0,1,1,1,]
+    [0,0,1,3,3,3]]
+
+    You'll get returned
+
+    [[1,1,1,1,0,0]
+    [1,1,1,0,0,0,]
+    [1,1,0,4,4,4,]]
+
+    """
+
+    l = _working_copy(room_list, list(inversion_dict.values()))
+
+    # Work out what each value ends up as, checking it against the keys in order like the values always have been (so
+    # the dictionary's applied in one pass, as a lookup table, instead of per cell and key)
+
+    remap = {}
+
+    for value in inversion_dict:
+
+        result = value
+
+        for i in inversion_dict:
+            if result == i:
+                result = inversion_dict[i]
+
+        if result != value:
+            remap[value] = result
+
+    if not remap:
+        return l
+
+    if l.array is not None and l.typecode == RG_TYPE_INT32:  # Too wide for a lookup table; remap value by value
+
+        original = l.array.copy()
+
+        for value in remap:
+            l.array[original == value] = remap[value]
+
+        return l
+
+    if l.array is not None:
+
+        low, high = _RG_RANGES[l.typecode]
+
+        table = numpy.arange(low, high + 1, dtype=_RG_DTYPES[l.typecode])
+
+        for value in remap:
+            if low <= value <= high:  # Values the grid can't hold can't be in it
+                table[value - low] = remap[value]
+
+        l.array[...] = table[l.array.astype(numpy.intp) - low]
+
+        return l
+
+    for y in range(l.size_y):
+
+        row = l.row(y)
+
+        for x, v in enumerate(row):
+            if v in remap:
+                row[x] = remap[v]
+
+    return l
+
+
+def _clean_up_pass(room_list):
+
+    # A single pass of clean_up() over the RoomGrid; returns a new RoomGrid.
+
+    size_x, size_y = room_list.size_x, room_list.size_y
+
+    left, right, up, down = _neighbor_planes(room_list, GSC_EDGE_VOID)
+
+    if room_list.array is not None:
+
+        a = room_list.array
+
+        has_left = numpy.ones(a.shape, dtype=bool)  # Which cells have a neighbor in each direction (aren't on the border)
+        has_right = has_left.copy()
+        has_up = has_left.copy()
+        has_down = has_left.copy()
+
+        has_left[:, 0] = has_right[:, -1] = has_up[0] = has_down[-1] = False
+
+        # A cell is isolated when every neighbor it has is different from it
+
+        isolated = (((left != a) | ~has_left) & ((right != a) | ~has_right) &
+                    ((up != a) | ~has_up) & ((down != a) | ~has_down))
+
+        replacement = numpy.select([has_left, has_right, has_up, has_down], [left, right, up, down], a)
+
+        return RoomGrid._wrap(room_list.typecode, numpy.where(isolated, replacement, a))
+
+    l = room_list.copy()
+
+    for y in range(size_y):
+
+        row = l.row(y)
+        this_row = room_list.row(y).tolist()
+
+        for x, this in enumerate(this_row):
+
+            cells = [left[y][x] if x > 0 else None, right[y][x] if x < size_x - 1 else None,
+                     up[y][x] if y > 0 else None, down[y][x] if y < size_y - 1 else None]
+
+            if this in cells:
+                continue
+
+            for c in cells:
+                if c is not None:
+                    row[x] = c
+                    break
+
+    return l
+
+
+
+def clean_up(room_list, iterations=1, in_place=False):
+    """
+
+    Cleans up the room list provided so that if there's numbers that are isolated, they are changed to the surrounding number.
+
+    I.e.
+
+    [[0, 0, 0, 1]
+    [0, 0, 1, 0]
+    [0, 0, 0, 0]
+    [1, 1, 1, 0],
+    [1, 0, 1, 1,]]
+
+    Gets turned to
+
+    [[0, 0, 0, 0]
+    [0, 0, 0, 0]
+    [0, 0, 0, 0]
+    [1, 1, 1, 0],
+    [1, 1, 1, 1,]]
+
+    iterations = how many passes to make; cells can become isolated by an earlier pass changing their neighbors, so
+    more passes clean up more. None runs passes until nothing changes anymore (or, for patterns that never settle, until
+    it's made as many passes as the grid is wide and tall).
+
+    in_place = if the room list passed in should be changed, rather than a changed copy being returned. Either way, the
+    cleaned up room list is returned.
+
+    """
+
+    grid = as_grid(room_list)
+
+    passes = grid.size_x + grid.size_y if iterations is None else iterations
+
+    result = grid
+
+    for p in range(passes):
+
+        cleaned = _clean_up_pass(result)
+
+        stable = cleaned == result
+
+        result = cleaned
+
+        if stable:
+            break
+
+    if not in_place:
+        return result if result is not grid else grid.copy()
+
+    if isinstance(room_list, RoomGrid):
+
+        if grid.array is not None:
+            grid.array[...] = result.array
+        else:
+            for y in range(grid.size_y):
+                grid.row(y)[:] = result.row(y)
+
+    else:
+
+        for row, cleaned_row in zip(room_list, result.to_list()):
+            row[:] = cleaned_row
+
+    return room_list
+
+def populate(room_list, room_4way, room_straight, room_end, room_corner, room_t, room_ceiling={0: None}, spawn_point=None,
+             varying_size=0, rng=None, static_meshes=None, bake_chunk_size=8):
+    """
+    Populates the in-game world with floor pieces according to the room that you feed into the function.
+
+    room_list = a room list to check that's generated with a Gen...() function.
+
+    room_4way - room_middle = dictionaries of room pieces to choose from. The numbered indices correspond to the numbers
+    you fed into the generation function. Will be randomly chosen from to allow for some good-looking random level
+    design. The dictionaries should look like:
+
+    room_4way = {1:['Room4WayRock', 'Room4WayStone', 'Room4WayStone2', etc], 2:[...]}
+
+    The number represents the cell type (i.e. a 1 on the grid will spawn one of the rooms in the 1 list)
+
+    room_4way = a room with four exits (a cross shape)
+    room_straight = a room with two exits across from each other; turned horizontally
+    room_end = a room with one exit (a dead end); opens to the west.
+    room_corner = a room with two exits (an L-shaped room); opens to the west and turns north (left).
+    room_t = a room with three exits (a T-shaped room); facing "upside-down", so that the flat part faces south.
+
+    room_ceiling = the same as above, but optional. This would be the objects to place on every null value (i.e. 0)
+
+    spawn_point = the center of the map, usually; if left to None, it will be the calling object's world position.
+
+    varying_size = if the size of the rooms is individual (i.e. each room can be different sizes), or if they're all the
+    same
+
+    rng = the random number generator to pick room pieces with - a random.Random or a NumPy Generator; defaults to the
+    random module itself.
+
+    static_meshes = if set, a dictionary of static mesh objects by material name to bake the spawned pieces into, a
+    static mesh per bake_chunk_size x bake_chunk_size chunk and material, to cut down on draw calls (see BakedLevel).
+
+    NOTE: Each game object that gets spawned gets a property called rlg_info with information about its place in the
+    level generation recorded in it. The rlg_info property has three keys: "shape", "pos", and "type".
+
+    The "shape" key equals one of the RLG_POP_xxxxx constants, which dictates what shape the object spawned was supposed to be.
+    The "pos" key equals the grid position in the random level map, with the Y-coordinate (or row) first, and the X-coordinate second.
+    The "type" key equals what type of object was spawned based on the random level map's numbers (i.e. it's a 1 if it was spawned
+    where a 1 was on the random level map).
+    The shapes (and the pieces' rotations) are worked out with get_cell_shapes(), which can also be called by itself.
+
+    Returns a dictionary comprised of these keys:
+    "spawned: A list of all room objects spawned
+    "room_map": The room_list that you fed in, but with the values replaced by references to the room objects spawned
+    (useful for storage and looking up a room in the list later)
+    "index": A LevelIndex, for finding which cell a world position is in (and the other way around)
+    "baked": The BakedLevel the pieces were baked into, if static_meshes was set
+
+    To spawn a large level over several frames instead of all at once, use a PopulateJob.
+    """
+
+    job = PopulateJob(room_list, room_4way, room_straight, room_end, room_corner, room_t, room_ceiling, spawn_point,
+                      varying_size, rng)
+
+    job.step()
+
+    result = job.result
+
+    if static_meshes is not None:
+        result['baked'] = BakedLevel(result, static_meshes, bake_chunk_size)
+
+    return result
+
+
+def repopulate(old_list, new_list, populated, room_4way, room_straight, room_end, room_corner, room_t,
+               room_ceiling={0: None}, spawn_point=None, varying_size=0, rng=None):
+    """
+    Updates a populated level after its room list has changed (i.e. a door opening or a wall being destroyed), rather
+    than ending every piece and populating it again. Only the cells whose value changed, or whose piece shape or
+    rotation changed because a neighbor did, have their pieces ended and spawned again.
+
+    old_list = the room list that was populated
+    new_list = the changed room list (the same size as old_list)
+    populated = the dictionary that populate() returned for old_list (or that repopulate() returned last time); its
+    room_map is updated in place.
+
+    The rest of the arguments are the same as populate()'s; pass the same spawn_point that was used to populate the
+    level, so the new pieces line up with the old ones.
+
+    Returns a dictionary laid out like populate()'s, with the pieces that were ended taken out of "spawned" and the new
+    pieces added to the end (without "baked").
+    """
+
+    old_grid = as_grid(old_list)
+    new_grid = as_grid(new_list)
+
+    if (old_grid.size_x, old_grid.size_y) != (new_grid.size_x, new_grid.size_y):
+        raise ValueError('The old and new room lists must be the same size.')
+
+    old_shapes = get_cell_shapes(old_grid)
+    new_shapes = get_cell_shapes(new_grid)
+
+    if new_grid.array is not None:
+
+        changed = old_grid.array != new_grid.array
+
+        for key in ('shape', 'rotation'):
+            changed |= old_shapes[key].array != new_shapes[key].array
+
+        changed = list(zip(*(c.tolist() for c in numpy.nonzero(changed))))
+
+    else:
+
+        changed = []
+
+        for y in range(new_grid.size_y):
+
+            rows = [old_grid.row(y), new_grid.row(y)]
+
+            for key in ('shape', 'rotation'):
+                rows += [old_shapes[key].row(y), new_shapes[key].row(y)]
+
+            for x, (a, b, c, d, e, f) in enumerate(zip(*rows)):
+                if a != b or c != d or e != f:
+                    changed.append((y, x))
+
+    job = PopulateJob(new_grid, room_4way, room_straight, room_end, room_corner, room_t, room_ceiling, spawn_point,
+                      varying_size, rng)
+
+    room_map = populated['room_map']
+
+    job.room_map = room_map
+
+    ended = set()
+    added = []
+
+    for y, x in changed:
+
+        r = room_map[y][x]
+
+        if not isinstance(r, int):  # A spawned piece
+            r.endObject()
+            ended.add(id(r))
+
+        room_map[y][x] = new_grid.get(y, x)
+
+        if job._has_piece(y, x):
+            added.append(job._spawn_cell(y, x))
+
+    spawned = [r for r in populated['spawned'] if id(r) not in ended] + added
+
+    return {'spawned': spawned, 'room_map': room_map, 'index': job.level_index}
+
+
+class LevelIndex():
+
+    """
+    Maps between world positions and the cells of a populated level in constant time, from where the level was spawned
+    (spawn_point, the center of the map) and how big each cell is (roomsize); populate() returns one under "index".
+    Cells are (row, column) tuples, like rlg_info's "pos".
+
+    room_map = the populated room map (a list of lists of spawned pieces, or cell values where nothing was spawned)
+    """
+
+    def __init__(self, size_x, size_y, spawn_point, roomsize, room_map):
+
+        self.size_x = size_x
+        self.size_y = size_y
+        self.spawn_point = spawn_point
+        self.roomsize = roomsize
+        self.room_map = room_map
+
+    def _nearest_cell(self, position):
+
+        # Returns the (row, column) of the cell nearest to the world position (which can be outside of the grid).
+
+        w, h = self.roomsize[0], self.roomsize[1]
+
+        x = (position[0] - self.spawn_point[0] + math.floor(self.size_x / 2.0) * w) / w
+        y = (self.size_y - 1) - (position[1] - self.spawn_point[1] + math.floor(self.size_y / 2.0) * h) / h
+
+        return int(round(y)), int(round(x))
+
+    def in_bounds(self, ry, rx):
+
+        return 0 <= ry < self.size_y and 0 <= rx < self.size_x
+
+    def cell_at(self, position):
+        """
+        Returns the cell the world position is in, or None if it's outside of the level.
+        """
+
+        cell = self._nearest_cell(position)
+
+        if self.in_bounds(*cell):
+            return cell
+
+        return None
+
+    def position_of(self, ry, rx):
+        """
+        Returns the world position of the center of the cell, as a list.
+        """
+
+        w, h = self.roomsize[0], self.roomsize[1]
+
+        cy = abs(ry - (self.size_y - 1))  # The rows go from the top down, but the Y-axis goes up
+
+        return [(rx * w) - math.floor(self.size_x / 2.0) * w + self.spawn_point[0],
+                (cy * h) - math.floor(self.size_y / 2.0) * h + self.spawn_point[1], self.spawn_point[2]]
+
+    def object_at(self, position):
+        """
+        Returns the piece spawned in the cell the world position is in, or None if there isn't one.
+        """
+
+        cell = self.cell_at(position)
+
+        if cell is None:
+            return None
+
+        piece = self.room_map[cell[0]][cell[1]]
+
+        return None if isinstance(piece, int) else piece
+
+    def neighbors(self, ry, rx, diagonal=False):
+        """
+        Returns the cells next to the cell (left, right, up, and down, and the diagonal cells too if diagonal is True)
+        that are inside the level.
+        """
+
+        if diagonal:
+            offsets = ((0, -1), (0, 1), (-1, 0), (1, 0), (-1, -1), (-1, 1), (1, -1), (1, 1))
+        else:
+            offsets = ((0, -1), (0, 1), (-1, 0), (1, 0))
+
+        return [(ry + y, rx + x) for y, x in offsets if self.in_bounds(ry + y, rx + x)]
+
+    def objects_in(self, top, left, bottom, right):
+        """
+        Returns the pieces spawned in the rectangle of cells from (top, left) to (bottom, right), inclusive; the
+        rectangle is clipped to the level.
+        """
+
+        top, left = max(top, 0), max(left, 0)
+
+        objects = []
+
+        for row in self.room_map[top:bottom + 1]:
+            objects.extend(piece for piece in row[left:right + 1] if not isinstance(piece, int))
+
+        return objects
+
+
+class PopulateJob():
+
+    """
+    An incremental populate(); instead of spawning the whole level in a single logic tick (which can freeze the game for
+    seconds on large maps), the pieces are spawned a slice at a time by calling step() once per frame, until done is
+    True. The arguments are the same as populate()'s, plus:
+
+    camera = a game object (usually the scene's active camera) or a world position; when given, the cells nearest to it
+    are spawned first. If it's a game object that moves while the job's running, the remaining cells are re-sorted
+    whenever it enters a different cell.
+
+    The spawned pieces and the room map are available in spawned and room_map (or result, which is laid out like
+    populate()'s return value) as the job goes on.
+
+    Example usage:
+
+    job = rlg.PopulateJob(level, room_4way, room_straight, room_end, room_corner, room_t, camera=scene.active_camera)
+
+    (then, every frame)
+
+    if not job.done:
+        job.step(time_budget=0.004)
+        print(int(job.progress * 100), '% loaded')
+    """
+
+    def __init__(self, room_list, room_4way, room_straight, room_end, room_corner, room_t, room_ceiling={0: None},
+                 spawn_point=None, varying_size=0, rng=None, camera=None):
+
+        self.scene = logic.getCurrentScene()
+        self.spawner = logic.getCurrentController().owner
+
+        self.rng = random if rng is None else _rng_for(None, rng)
+
+        self.room_list = as_grid(room_list)
+        self.room_ceiling = room_ceiling
+        self.varying_size = varying_size
+        self.camera = camera
+
+        self.spawned = []
+
+        roomsize = None
+
+        if not varying_size or camera is not None:
+            i = list(room_4way.keys())[0]
+            roomsize = get_dimensions(room_4way[i][0])[0]
+
+        shapes = get_cell_shapes(self.room_list)  # Shapes and turns of every cell, in one pass
+
+        self.shape_rows = shapes['shape'].to_list()
+        self.rotation_rows = shapes['rotation'].to_list()
+
+        self.pieces = {RLG_POP_END: room_end, RLG_POP_STRAIGHT: room_straight, RLG_POP_CORNER: room_corner,
+                       RLG_POP_T_END: room_t, RLG_POP_4WAY: room_4way}
+
+        self.orientations = []  # The spawner's orientation, turned to each of the rotations
+
+        for angle in RLG_ROTATIONS:
+            ori = self.spawner.worldOrientation.to_euler()
+            ori.z = angle
+            self.orientations.append(ori)
+
+        self.orientations.append(self.spawner.worldOrientation.to_euler())
+
+        self.pool = None  # Unused pieces by object name, to spawn from instead of adding new ones (see StreamedLevel)
+        self.chosen = None  # The piece picked for each cell (by flat index), so respawned cells look the same
+
+        self.spawn_point = list(self.spawner.worldPosition if spawn_point is None else spawn_point)
+
+        self.level_index = LevelIndex(self.room_list.size_x, self.room_list.size_y, self.spawn_point, roomsize,
+                                      self.room_list.to_list())
+
+        size_x = self.room_list.size_x
+
+        self.queue = []  # Flat indices of the cells that get a piece, in the order they're spawned
+
+        for ry in range(self.room_list.size_y):
+
+            for rx in range(size_x):
+
+                if self._has_piece(ry, rx):
+                    self.queue.append(ry * size_x + rx)
+
+        self.index = 0  # How far into the queue the job is
+
+        self._camera_cell = None
+
+        if camera is not None:
+            self._sort_queue()
+
+    @property
+    def done(self):
+
+        return self.index >= len(self.queue)
+
+    @property
+    def progress(self):
+        """
+        How much of the level has been spawned, from 0.0 to 1.0.
+        """
+
+        if not self.queue:
+            return 1.0
+
+        return self.index / len(self.queue)
+
+    @property
+    def room_map(self):
+
+        return self.level_index.room_map
+
+    @room_map.setter
+    def room_map(self, room_map):
+
+        self.level_index.room_map = room_map
+
+    @property
+    def result(self):
+
+        return {'spawned': self.spawned, 'room_map': self.room_map, 'index': self.level_index}
+
+    def _has_piece(self, ry, rx):
+
+        # Returns if the cell gets a piece spawned for it at all.
+
+        cell = self.room_list.get(ry, rx)
+
+        return cell not in self.room_ceiling or self.room_ceiling[cell] is not None
+
+    def _camera_position(self):
+
+        return getattr(self.camera, 'worldPosition', self.camera)
+
+    def _sort_queue(self):
+
+        # Re-sorts the cells that haven't been spawned yet by their distance to the camera's cell.
+
+        cell = self.level_index._nearest_cell(self._camera_position())
+
+        if cell == self._camera_cell:
+            return
+
+        self._camera_cell = cell
+
+        size_x = self.room_list.size_x
+
+        cy, cx = cell
+
+        remaining = self.queue[self.index:]
+        remaining.sort(key=lambda i: (i // size_x - cy) ** 2 + (i % size_x - cx) ** 2)
+
+        self.queue[self.index:] = remaining
+
+    def _spawn_cell(self, ry, rx):
+
+        # Spawns (or takes from the pool) the piece for the cell, and places it; returns the piece.
+
+        size_x = self.room_list.size_x
+        room_ceiling = self.room_ceiling
+
+        cell = self.room_list.get(ry, rx)
+
+        if not cell in room_ceiling:  # Not blank
+
+            shape = self.shape_rows[ry][rx]
+            turns = self.rotation_rows[ry][rx]
+
+            choices = self.pieces[shape][cell]
+
+        else:  # Blank, so it's a ceiling piece.
+
+            shape = RLG_POP_CEIL
+            turns = -1
+
+            choices = room_ceiling[cell]
+
+        if self.chosen is None:
+            roomchoice = self.rng.choice(choices)
+        else:
+            roomchoice = self.chosen.get(ry * size_x + rx)
+
+            if roomchoice is None:
+                roomchoice = self.chosen[ry * size_x + rx] = self.rng.choice(choices)
+
+        # Pooled pieces are kept by name, and the piece dictionaries can hold game objects as well as names
+
+        name = roomchoice if isinstance(roomchoice, str) else roomchoice.name
+
+        if self.pool and self.pool.get(name):
+
+            r = self.pool[name].pop()
+            r.visible = True
+
+            if hasattr(r, 'restorePhysics'):
+                r.restorePhysics()
+            r.orientation = self.orientations[turns]  # Index -1 is the spawner's own orientation, for unturned pieces
+
+        else:
+
+            r = self.scene.addObject(roomchoice, self.spawner)
+
+            if turns >= 0:
+                r.orientation = self.orientations[turns]
+
+        if self.varying_size and shape != RLG_POP_CEIL:
+            self.level_index.roomsize = get_dimensions(r)[0]
+
+        r['rlg_info'] = {'shape': shape, 'type': cell, 'pos': (ry, rx)}
+
+        self.room_map[ry][rx] = r
+
+        r.worldPosition = self.level_index.position_of(ry, rx)
+
+        return r
+
+    def step(self, time_budget=None, object_budget=None):
+        """
+        Spawns pieces until the time budget (in seconds) or object budget (a number of pieces) for this frame runs out,
+        or until the level is finished. With neither budget, the rest of the level is spawned at once.
+
+        Returns True when the level's been completely spawned.
+        """
+
+        if self.camera is not None and hasattr(self.camera, 'worldPosition'):
+            self._sort_queue()
+
+        if time_budget is not None:
+            end_time = time.perf_counter() + time_budget
+
+        size_x = self.room_list.size_x
+
+        queue = self.queue
+
+        count = 0
+
+        while self.index < len(queue):
+
+            if object_budget is not None and count >= object_budget:
+                break
+
+            if time_budget is not None and count > 0 and time.perf_counter() >= end_time:
+                break
+
+            ry, rx = divmod(queue[self.index], size_x)
+
+            self.index += 1
+            count += 1
+
+            self.spawned.append(self._spawn_cell(ry, rx))
+
+        return self.done
+
+
+_POOL_POSITION = [0.0, 0.0, -100000.0]  # Where pooled pieces are moved to, without suspendPhysics()
+
+
+class StreamedLevel():
+
+    """
+    Populates a level around a reference object (the scene's active camera by default) instead of all at once; only
+    the cells within radius cells of it have pieces spawned, and pieces are ended (or pooled, to be reused for other
+    cells) once their cells are further than despawn_radius away. The gap between the two radii keeps pieces near the
+    edge from being spawned and ended over and over as the reference object moves back and forth. This keeps the
+    number of objects in the scene (and the logic cost) about the same no matter how big the level is.
+
+    The arguments are the same as populate()'s, plus:
+
+    reference = the game object to stream the level around; defaults to the scene's active camera
+    radius = how many cells away from the reference object cells get spawned
+    despawn_radius = how many cells away from the reference object cells get removed; defaults to radius + 2
+    pool = if removed pieces should be hidden and kept to be reused rather than ended; pooled pieces are also taken out
+    of the physics world (or moved far out of the way, where suspendPhysics() isn't available), so they don't block
+    anything or get in the way of rays where the level's been unloaded
+    object_budget = how many pieces can be spawned per update() at most; None means no limit
+    roomsize = how big each cell is, as a list of [width, height]; by default, the size of the first 4-way piece. It's
+    only used with varying_size, as the cells' size is needed to know which cell the reference object is in before any
+    pieces have been spawned
+
+    Call update() every frame. Each cell keeps the same piece whenever it's spawned again. The spawned pieces have the
+    same rlg_info property as with populate(), and room_map holds the spawned piece for cells that are in range and
+    the original cell value for cells that aren't.
+    """
+
+    def __init__(self, room_list, room_4way, room_straight, room_end, room_corner, room_t, room_ceiling={0: None},
+                 spawn_point=None, varying_size=0, rng=None, reference=None, radius=8, despawn_radius=None, pool=True,
+                 object_budget=None, roomsize=None):
+
+        self.job = PopulateJob(room_list, room_4way, room_straight, room_end, room_corner, room_t, room_ceiling,
+                               spawn_point, varying_size, rng)
+
+        if self.job.level_index.roomsize is None:  # Varying sizes; start with the given size, or the first 4-way piece's
+
+            if roomsize is None:
+
+                piece = room_4way[list(room_4way.keys())[0]][0]
+
+                if isinstance(piece, str):
+                    piece = self.job.scene.objectsInactive[piece]
+
+                roomsize = get_dimensions(piece)[0]
+
+            self.job.level_index.roomsize = roomsize
+
+        self.job.chosen = {}
+
+        if pool:
+            self.job.pool = {}
+
+        if reference is None:
+            reference = self.job.scene.active_camera
+
+        if despawn_radius is None:
+            despawn_radius = radius + 2
+
+        self.reference = reference
+        self.radius = radius
+        self.despawn_radius = max(radius, despawn_radius)
+        self.object_budget = object_budget
+
+        self.live = {}  # Spawned pieces, by (row, column)
+
+        self._center = None
+        self._pending = []  # Cells in range still to spawn, furthest first
+
+    @property
+    def room_map(self):
+
+        return self.job.room_map
+
+    @property
+    def spawned(self):
+
+        return list(self.live.values())
+
+    @property
+    def result(self):
+
+        return {'spawned': self.spawned, 'room_map': self.room_map, 'index': self.job.level_index}
+
+    def _despawn(self, key):
+
+        r = self.live.pop(key)
+
+        ry, rx = key
+
+        self.room_map[ry][rx] = self.job.room_list.get(ry, rx)
+
+        if self.job.pool is None:
+
+            r.endObject()
+
+        else:
+
+            del r['rlg_info']
+            r.visible = False
+
+            if hasattr(r, 'suspendPhysics'):
+                r.suspendPhysics()
+            else:
+                r.worldPosition = _POOL_POSITION
+
+            self.job.pool.setdefault(r.name, []).append(r)
+
+    def update(self):
+        """
+        Spawns and removes pieces as the reference object moves between cells; returns how many cells in range are
+        still waiting to be spawned (because of the object budget).
+        """
+
+        job = self.job
+
+        center = job.level_index._nearest_cell(self.reference.worldPosition)
+
+        if center != self._center:
+
+            self._center = center
+
+            cy, cx = center
+
+            far = self.despawn_radius ** 2
+
+            for key in [k for k in self.live if (k[0] - cy) ** 2 + (k[1] - cx) ** 2 > far]:
+                self._despawn(key)
+
+            near = self.radius ** 2
+            r = int(self.radius)
+
+            pending = []
+
+            for y in range(max(0, cy - r), min(job.room_list.size_y, cy + r + 1)):
+
+                for x in range(max(0, cx - r), min(job.room_list.size_x, cx + r + 1)):
+
+                    dist = (y - cy) ** 2 + (x - cx) ** 2
+
+                    if dist <= near and (y, x) not in self.live and job._has_piece(y, x):
+                        pending.append((dist, y, x))
+
+            pending.sort(reverse=True)
+
+            self._pending = pending
+
+        count = 0
+
+        while self._pending and (self.object_budget is None or count < self.object_budget):
+
+            dist, y, x = self._pending.pop()
+
+            self.live[(y, x)] = job._spawn_cell(y, x)
+
+            count += 1
+
+        return len(self._pending)
+
+    def end(self):
+        """
+        Ends every piece, both spawned and pooled.
+        """
+
+        for key in list(self.live):
+            self.live[key].endObject()
+            self.room_map[key[0]][key[1]] = self.job.room_list.get(key[0], key[1])
+
+        self.live.clear()
+        self._pending = []
+        self._center = None
+
+        if self.job.pool:
+
+            for pieces in self.job.pool.values():
+                for r in pieces:
+                    r.endObject()
+
+            self.job.pool.clear()
+
+
+class BakedLevel():
+
+    """
+    Merges the pieces of a populated level into static meshes (see mesh.flatten()), one for every chunk_size x
+    chunk_size chunk of cells and material, so that the level's drawn in a handful of batches rather than as one object
+    per cell. Each cell's vertices in its chunk's mesh are recorded, so a single cell can be unbaked (and rebaked with
+    a different piece) later.
+
+    populated = the dictionary populate() returned
+    static_meshes = a dictionary of the names of the (hidden-layer) objects to use as static meshes, by material name
+    as KX_MeshProxy.getMaterialName() returns it (i.e. {'MAStone': 'StaticStone'}). A None key matches every other
+    material; pieces whose material isn't in the dictionary aren't baked. Each static mesh object is spawned once per
+    chunk, with its own copy of the mesh, and should have enough vertices to hold the pieces of a whole chunk that use
+    its material.
+    chunk_size = how many cells wide and tall each chunk is
+    end_pieces = if baked pieces should be ended; otherwise, they're made invisible (keeping their physics and rlg_info)
+
+    The static mesh objects are in chunks, by (chunk_x, chunk_y) and then by material, and each baked cell's static mesh
+    object and vertices are in cells, by (row, column).
+    """
+
+    def __init__(self, populated, static_meshes, chunk_size=8, end_pieces=False):
+
+        self.scene = logic.getCurrentScene()
+        self.spawner = logic.getCurrentController().owner
+
+        self.room_map = populated['room_map']
+        self.static_meshes = static_meshes
+        self.chunk_size = chunk_size
+        self.end_pieces = end_pieces
+
+        self.chunks = {}
+        self.cells = {}
+
+        groups = collections.OrderedDict()  # Pieces by (chunk, material)
+
+        for ry, row in enumerate(self.room_map):
+
+            for rx, piece in enumerate(row):
+
+                if isinstance(piece, int):  # No piece spawned here
+                    continue
+
+                material = self._material_of(piece)
+
+                if material is not False:
+                    groups.setdefault(((rx // chunk_size, ry // chunk_size), material), []).append((ry, rx, piece))
+
+        for (chunk, material), items in groups.items():
+            self._bake(chunk, material, items)
+
+    def _material_of(self, piece):
+
+        # Returns the static_meshes key the piece is baked under, or False if it isn't baked.
+
+        material = piece.meshes[0].getMaterialName(0)
+
+        if material in self.static_meshes:
+            return material
+
+        if None in self.static_meshes:
+            return None
+
+        return False
+
+    def _destination(self, chunk, material, items):
+
+        # Returns the static mesh object for the chunk and material, spawning it (centered on the pieces) if needed.
+
+        meshes = self.chunks.setdefault(chunk, {})
+
+        if material not in meshes:
+
+            dest = self.scene.addObject(self.static_meshes[material], self.spawner)
+            dest.replaceMesh(make_unique_mesh(dest.meshes[0]))
+
+            center = [0.0, 0.0, 0.0]
+
+            for ry, rx, piece in items:
+                for i in range(3):
+                    center[i] += piece.worldPosition[i] / len(items)
+
+            dest.worldPosition = center
+
+            meshes[material] = dest
+
+        return meshes[material]
+
+    def _bake(self, chunk, material, items):
+
+        dest = self._destination(chunk, material, items)
+
+        verts = flatten(dest, [piece for ry, rx, piece in items], use_orientation=True)
+
+        for (ry, rx, piece), v in zip(items, verts):  # Pieces that didn't fit into the static mesh are left as they are
+
+            self.cells[(ry, rx)] = (dest, v)
+
+            if self.end_pieces:
+                piece.endObject()
+            else:
+                piece.visible = False
+
+    def unbake_cell(self, ry, rx):
+        """
+        Removes the cell's vertices from its chunk's static mesh, showing the cell's piece again if it wasn't ended.
+        Returns True if the cell was baked.
+        """
+
+        if (ry, rx) not in self.cells:
+            return False
+
+        dest, verts = self.cells.pop((ry, rx))
+
+        unflatten(dest, verts)
+
+        piece = self.room_map[ry][rx]
+
+        if not self.end_pieces and not isinstance(piece, int) and not piece.invalid:
+            piece.visible = True
+
+        return True
+
+    def bake_cell(self, ry, rx, piece=None):
+        """
+        Bakes the piece into the static mesh of the cell's chunk, replacing whatever was baked there before. If piece is
+        None, the cell's piece in the room map is used; otherwise, it's put into the room map.
+        """
+
+        self.unbake_cell(ry, rx)
+
+        if piece is None:
+            piece = self.room_map[ry][rx]
+        else:
+            self.room_map[ry][rx] = piece
+
+        material = self._material_of(piece)
+
+        if material is not False:
+            self._bake((rx // self.chunk_size, ry // self.chunk_size), material, [(ry, rx, piece)])
+
+
+# Octant transforms for shadowcasting; column o is (xx, xy, yx, yy) for octant o
+
+_OCTANTS = ((1, 0, 0, -1, -1, 0, 0, 1),
+            (0, 1, -1, 0, 0, -1, 1, 0),
+            (0, 1, 1, 0, 0, -1, -1, 0),
+            (1, 0, 0, 1, -1, 0, 0, -1))
+
+
+def _cast_light(walkable, size_x, size_y, cx, cy, row, start, end, radius, xx, xy, yx, yy, seen):
+
+    # Recursive shadowcasting over one octant around (cx, cy); adds the flat indices of the cells it can see (including
+    # the unwalkable cells that block the view) to seen.
+
+    if start < end:
+        return
+
+    radius_sq = radius * radius
+    new_start = start
+
+    for j in range(row, radius + 1):
+
+        dx = -j - 1
+        dy = -j
+
+        blocked = False
+
+        while dx <= 0:
+
+            dx += 1
+
+            x = cx + dx * xx + dy * xy
+            y = cy + dx * yx + dy * yy
+
+            l_slope = (dx - 0.5) / (dy + 0.5)
+            r_slope = (dx + 0.5) / (dy - 0.5)
+
+            if start < r_slope:
+                continue
+            elif end > l_slope:
+                break
+
+            inside = 0 <= x < size_x and 0 <= y < size_y
+
+            if inside and dx * dx + dy * dy <= radius_sq:
+                seen.add(y * size_x + x)
+
+            opaque = not inside or not walkable[y * size_x + x]
+
+            if blocked:
+
+                if opaque:
+                    new_start = r_slope
+                    continue
+
+                blocked = False
+                start = new_start
+
+            elif opaque and j < radius:
+
+                blocked = True
+
+                _cast_light(walkable, size_x, size_y, cx, cy, j + 1, start, l_slope, radius, xx, xy, yx, yy, seen)
+
+                new_start = r_slope
+
+        if blocked:
+            break
+
+
+class LevelVisibility():
+
+    """
+    Precomputed potentially visible sets (PVS) for a level; for every walkable cell, which cells can be seen from it,
+    using grid line-of-sight (shadowcasting, with the cells in empty_types blocking the view). The unwalkable cells
+    bordering what can be seen (i.e. walls and ceiling pieces) count as seen, too. The sets are made symmetric (if a cell
+    can be seen from another, that one can be seen from it), erring on the side of showing more.
+
+    room_list = the room list to work out the visibility of
+    empty_types = the cell values that can't be seen through
+    radius = how many cells away from each cell can be seen at most; this also bounds the size of each cell's set
+
+    Each set is stored as a bitset (a Python int) over the (radius * 2 + 1)-square window of cells centered on its cell,
+    in bits, by flat index (y * size_x + x).
+    """
+
+    def __init__(self, room_list, empty_types=[0], radius=16):
+
+        grid = as_grid(room_list)
+
+        self.size_x = grid.size_x
+        self.size_y = grid.size_y
+        self.radius = radius
+
+        self.bits = {}
+
+        walkable = _walkable_cells(grid, empty_types)
+
+        size_x, size_y = self.size_x, self.size_y
+        width = radius * 2 + 1
+
+        sets = {}
+
+        for i, open_cell in enumerate(walkable):
+
+            if not open_cell:
+                continue
+
+            cy, cx = divmod(i, size_x)
+
+            seen = sets.setdefault(i, set())
+            seen.add(i)
+
+            for o in range(8):
+                _cast_light(walkable, size_x, size_y, cx, cy, 1, 1.0, 0.0, radius, _OCTANTS[0][o], _OCTANTS[1][o],
+                            _OCTANTS[2][o], _OCTANTS[3][o], seen)
+
+            for s in seen:  # Shadowcasting isn't symmetric, so make sure that cells seen from here can see here, too
+                if walkable[s] and s != i:
+                    sets.setdefault(s, set()).add(i)
+
+        for i, seen in sets.items():
+
+            cy, cx = divmod(i, size_x)
+
+            bits = 0
+
+            for s in seen:
+                y, x = divmod(s, size_x)
+                bits |= 1 << ((y - cy + radius) * width + (x - cx + radius))
+
+            self.bits[i] = bits
+
+    def visible_from(self, ry, rx):
+        """
+        Returns the set of cells, as (row, column) tuples, that can be seen from the cell; None if the cell isn't
+        walkable (so nothing was worked out for it).
+        """
+
+        bits = self.bits.get(ry * self.size_x + rx)
+
+        if bits is None:
+            return None
+
+        width = self.radius * 2 + 1
+        top = ry - self.radius
+        left = rx - self.radius
+
+        cells = set()
+
+        while bits:
+
+            low = bits & -bits  # The lowest set bit
+
+            y, x = divmod(low.bit_length() - 1, width)
+            cells.add((top + y, left + x))
+
+            bits ^= low
+
+        return cells
+
+    def is_visible(self, from_y, from_x, to_y, to_x):
+        """
+        Returns if the cell at (to_y, to_x) can be seen from the cell at (from_y, from_x).
+        """
+
+        bits = self.bits.get(from_y * self.size_x + from_x)
+
+        dy = to_y - from_y + self.radius
+        dx = to_x - from_x + self.radius
+
+        if bits is None or not (0 <= dy <= self.radius * 2 and 0 <= dx <= self.radius * 2):
+            return False
+
+        return bool(bits >> (dy * (self.radius * 2 + 1) + dx) & 1)
+
+
+class VisibilityCuller():
+
+    """
+    Hides the pieces of a populated level that can't be seen from the camera's cell, according to a LevelVisibility.
+    Only the pieces whose visibility changed since the last update are touched.
+
+    visibility = the LevelVisibility of the populated room list
+    populated = the dictionary populate() returned (only its room_map is used, so pieces spawned and ended later, i.e.
+    by repopulate(), are picked up)
+    """
+
+    def __init__(self, visibility, populated):
+
+        self.visibility = visibility
+        self.room_map = populated['room_map']
+
+        self.visible = None  # The cells shown at the last update (None means all of them, before the first update)
+
+    def _set_visible(self, cell, visible):
+
+        piece = self.room_map[cell[0]][cell[1]]
+
+        if not isinstance(piece, int):
+            piece.visible = visible
+
+    def update(self, ry, rx):
+        """
+        Shows the pieces that can be seen from the cell the camera's in (ry, rx), and hides the rest. If the camera's in
+        an unwalkable cell, nothing changes.
+
+        i.e. culler.update(*populated['index'].cell_at(camera.worldPosition))
+        """
+
+        cells = self.visibility.visible_from(ry, rx)
+
+        if cells is None:
+            return
+
+        if self.visible is None:
+
+            for y, row in enumerate(self.room_map):
+                for x in range(len(row)):
+                    self._set_visible((y, x), (y, x) in cells)
+
+        else:
+
+            for cell in self.visible - cells:
+                self._set_visible(cell, False)
+
+            for cell in cells - self.visible:
+                self._set_visible(cell, True)
+
+        self.visible = cells
+
+    def show_all(self):
+        """
+        Shows every piece again.
+        """
+
+        for y, row in enumerate(self.room_map):
+            for x in range(len(row)):
+                self._set_visible((y, x), True)
+
+        self.visible = None